@@ -0,0 +1,158 @@
+"""Операції віртуальних клієнтів та їхні суміші (сценарії)"""
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+from src.services.auth import TELEGRAM_SECRET_KEY, create_access_token, build_user_claims
+
+from .seed import SeedData
+
+# Операція повертає (шаблон маршруту, HTTP-статус)
+Operation = Callable[..., Awaitable[Tuple[str, int]]]
+
+def sign_init_data(user: dict, query_id: str) -> str:
+    """initData у форматі Telegram Mini App, підписаний ключем бота"""
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": query_id,
+        "user": json.dumps(user, separators=(",", ":")),
+    }
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    fields["hash"] = hmac.new(TELEGRAM_SECRET_KEY, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return "&".join(f"{key}={quote(value)}" for key, value in fields.items())
+
+class LoadContext:
+    """Спільний стан сценаріїв: токени, черга завдань на схвалення, ETag клієнтів"""
+
+    def __init__(self, data: SeedData):
+        self.data = data
+        self.user_tokens = [self._token(user) for user in data.users]
+        self.admin_tokens = [self._token(user) for user in data.admins]
+        self.pending_task_ids = list(data.pending_task_ids)
+        self.etags: Dict[str, str] = {}
+        self.recent_init_data: Dict[str, int] = {}
+        self.new_users = 0
+
+    @staticmethod
+    def _token(user) -> str:
+        return create_access_token(build_user_claims(user, 0))
+
+    @staticmethod
+    def auth(token: str, **headers) -> dict:
+        return {"Authorization": f"Bearer {token}", **headers}
+
+async def login(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    """Вхід: 70% існуючих користувачів, 30% нових, 20% повторів того ж initData"""
+    if ctx.recent_init_data and rng.random() < 0.2:
+        # Повтор клієнта: той самий payload, в межах ліміту обмінів на токен
+        init_data = rng.choice(list(ctx.recent_init_data))
+        ctx.recent_init_data[init_data] += 1
+        if ctx.recent_init_data[init_data] >= 3:
+            del ctx.recent_init_data[init_data]
+    else:
+        if rng.random() < 0.7:
+            user = rng.choice(ctx.data.users)
+            profile = {"id": user.telegram_id, "username": user.username, "first_name": user.first_name}
+        else:
+            ctx.new_users += 1
+            profile = {"id": f"bench-new-{uuid.uuid4().hex[:12]}", "username": f"new_{ctx.new_users}"}
+        init_data = sign_init_data(profile, query_id=uuid.uuid4().hex)
+        ctx.recent_init_data[init_data] = 1
+        if len(ctx.recent_init_data) > 50:
+            del ctx.recent_init_data[next(iter(ctx.recent_init_data))]
+    response = await client.post("/api/auth/login", json={"initData": init_data})
+    return "POST /api/auth/login", response.status_code
+
+async def poll_tasks(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    """Опитування списку завдань з If-None-Match, як це робить Mini App"""
+    token = rng.choice(ctx.user_tokens)
+    headers = ctx.auth(token)
+    if token in ctx.etags:
+        headers["If-None-Match"] = ctx.etags[token]
+    response = await client.get("/api/tasks/", headers=headers)
+    if "etag" in response.headers:
+        ctx.etags[token] = response.headers["etag"]
+    return "GET /api/tasks/", response.status_code
+
+async def current_user(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    response = await client.get("/api/auth/me", headers=ctx.auth(rng.choice(ctx.user_tokens)))
+    return "GET /api/auth/me", response.status_code
+
+async def create_task(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    response = await client.post(
+        "/api/tasks/",
+        headers=ctx.auth(rng.choice(ctx.user_tokens)),
+        json={
+            "geo_location": "US",
+            "comments": [f"Коментар {n}" for n in range(8)],
+            "post_links": [f"https://facebook.com/post/{uuid.uuid4().hex[:8]}"],
+        }
+    )
+    if response.status_code == 200:
+        ctx.pending_task_ids.append(response.json()["task_id"])
+    return "POST /api/tasks/", response.status_code
+
+async def admin_stats(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    response = await client.get("/api/admin/stats", headers=ctx.auth(rng.choice(ctx.admin_tokens)))
+    return "GET /api/admin/stats", response.status_code
+
+async def admin_users(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    response = await client.get("/api/admin/users", headers=ctx.auth(rng.choice(ctx.admin_tokens)))
+    return "GET /api/admin/users", response.status_code
+
+async def admin_pending(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    response = await client.get("/api/admin/pending-tasks", headers=ctx.auth(rng.choice(ctx.admin_tokens)))
+    return "GET /api/admin/pending-tasks", response.status_code
+
+async def approve(ctx: LoadContext, client, rng: random.Random) -> Tuple[str, int]:
+    """Кілька адмінів розбирають одну чергу: частина запитів програє гонку (409)"""
+    if not ctx.pending_task_ids:
+        return await create_task(ctx, client, rng)
+    # Вибір з голови черги, як у списку "очікують схвалення" в адмінці
+    window = ctx.pending_task_ids[:8]
+    task_id = rng.choice(window)
+    response = await client.post(
+        "/api/admin/approve-task",
+        headers=ctx.auth(rng.choice(ctx.admin_tokens)),
+        json={"task_id": task_id, "action": "approve" if rng.random() < 0.8 else "reject"}
+    )
+    if response.status_code in (200, 404, 409) and task_id in ctx.pending_task_ids:
+        ctx.pending_task_ids.remove(task_id)
+    return "POST /api/admin/approve-task", response.status_code
+
+# Сценарій: операція -> вага
+SCENARIOS: Dict[str, Dict[Operation, float]] = {
+    "login_burst": {login: 1.0},
+    "task_polling": {poll_tasks: 0.85, current_user: 0.15},
+    "admin_stats": {admin_stats: 0.6, admin_users: 0.2, admin_pending: 0.2},
+    "approve_storm": {approve: 0.8, admin_pending: 0.2},
+    "mixed": {
+        poll_tasks: 0.55,
+        current_user: 0.1,
+        login: 0.1,
+        create_task: 0.05,
+        admin_stats: 0.08,
+        admin_pending: 0.05,
+        admin_users: 0.02,
+        approve: 0.05,
+    },
+}
+
+# Статуси, що є очікуваною поведінкою, а не помилкою (304 ETag, 409 програна гонка)
+EXPECTED_STATUSES = {200, 304, 404, 409}
+
+def pick_operation(scenario: Dict[Operation, float], rng: random.Random) -> Operation:
+    operations = list(scenario)
+    return rng.choices(operations, weights=[scenario[op] for op in operations])[0]
+
+def describe(name: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    selected = {name: SCENARIOS[name]} if name else SCENARIOS
+    return {
+        scenario_name: {op.__name__: weight for op, weight in ops.items()}
+        for scenario_name, ops in selected.items()
+    }
@@ -0,0 +1,94 @@
+"""Синтетичні дані для навантажувального тесту API"""
+from sqlalchemy import func, insert, select, text
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from src.models.database import User, AutomationTask, FacebookAccount, COLUMN_BACKFILLS
+from src.routes.tasks import SUPPORTED_GEOS
+from src.services.stats_counters import reconcile_counters
+
+class SeedData:
+    """Ідентифікатори, якими оперують сценарії"""
+
+    def __init__(self, admins: List[User], users: List[User], pending_task_ids: List[str]):
+        self.admins = admins
+        self.users = users
+        self.pending_task_ids = pending_task_ids
+
+async def database_is_empty(session_factory) -> bool:
+    async with session_factory() as db:
+        return not (await db.execute(select(func.count(User.id)))).scalar()
+
+async def seed(
+    session_factory,
+    users: int,
+    admins: int,
+    tasks_per_user: int,
+    pending_tasks: int,
+    random_seed: int = 42
+) -> SeedData:
+    rng = random.Random(random_seed)
+    start = datetime.utcnow() - timedelta(days=30)
+
+    async with session_factory() as db:
+        await db.execute(insert(User.__table__), [
+            {
+                "telegram_id": f"bench-{i}",
+                "username": f"bench_user_{i}",
+                "first_name": f"Bench {i}",
+                "is_approved": True,
+                "is_admin": i < admins,
+                "created_at": start + timedelta(minutes=i),
+                "last_activity": start + timedelta(minutes=i),
+            }
+            for i in range(users + admins)
+        ])
+        await db.execute(insert(FacebookAccount.__table__), [
+            {"account_name": f"bench_{geo}_{n}", "geo_location": geo}
+            for geo in SUPPORTED_GEOS
+            for n in range(3)
+        ])
+        seeded_users = list((await db.execute(
+            select(User).where(User.telegram_id.like("bench-%")).order_by(User.id)
+        )).scalars())
+        regular = [user for user in seeded_users if not user.is_admin]
+
+        tasks: List[Dict] = []
+        for user in regular:
+            for n in range(tasks_per_user):
+                created_at = start + timedelta(minutes=rng.randrange(30 * 24 * 60))
+                tasks.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": user.id,
+                    "geo_location": rng.choice(SUPPORTED_GEOS),
+                    "comments": [f"Коментар {k} для навантаження" for k in range(8)],
+                    "post_links": [f"https://facebook.com/post/{user.id}/{n}"],
+                    "status": rng.choice(("completed", "completed", "failed", "rejected")),
+                    "comments_posted": 8,
+                    "created_at": created_at,
+                })
+        pending_task_ids = []
+        for _ in range(pending_tasks):
+            task_id = str(uuid.uuid4())
+            pending_task_ids.append(task_id)
+            tasks.append({
+                "id": task_id,
+                "user_id": rng.choice(regular).id,
+                "geo_location": rng.choice(SUPPORTED_GEOS),
+                "comments": [f"Коментар {k} для навантаження" for k in range(8)],
+                "post_links": ["https://facebook.com/post/pending"],
+                "status": "pending_approval",
+                "comments_posted": 0,
+                "created_at": start + timedelta(minutes=rng.randrange(30 * 24 * 60)),
+            })
+        for offset in range(0, len(tasks), 5000):
+            await db.execute(insert(AutomationTask.__table__), tasks[offset:offset + 5000])
+
+        await db.execute(text(COLUMN_BACKFILLS["users.tasks_count"]))
+        await db.commit()
+        await reconcile_counters(db)
+
+    admins_list = [user for user in seeded_users if user.is_admin]
+    return SeedData(admins=admins_list, users=regular, pending_task_ids=pending_task_ids)
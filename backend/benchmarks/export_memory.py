@@ -0,0 +1,218 @@
+"""Пам'ять сервера під час потокового експорту: RSS не повинен залежати від кількості рядків.
+
+Запуск (з папки backend/):
+
+    python -m benchmarks.export_memory --rows 100000 1000000
+    python -m benchmarks.export_memory --rows 100000 1000000 --format ndjson csv --buffered
+
+Скрипт наповнює базу max(--rows) завданнями (created_at зростає на секунду),
+запускає uvicorn окремим процесом і вивантажує перші N рядків через
+GET /api/admin/export/tasks?created_to=..., читаючи /proc/<pid>/status
+кожні 20 мс. Для кожного розміру друкується час, швидкість, VmRSS та
+RssAnon до запиту і їх піки. Показник — зростання RssAnon (купа процесу):
+VmRSS включає сторінки файлу бази, відображені через mmap SQLite
+(до SQLITE_MMAP_SIZE), і росте з розміром бази, а не відповіді. --buffered додатково вимірює GET /api/admin/pending-tasks
+(10% рядків одним JSON-масивом) для порівняння з відповіддю, зібраною в пам'яті.
+Без --database-url використовується тимчасова SQLite. Лише Linux (/proc).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+# Початок діапазону created_at: рядок i створено через i секунд після BASE_TIME
+BASE_TIME = datetime(2024, 1, 1)
+SEED_CHUNK = 10000
+STATUSES = ("completed", "failed", "rejected", "processing", "approved",
+            "completed", "completed", "failed", "completed", "pending_approval")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--format", nargs="+", choices=["ndjson", "csv"], default=["ndjson"])
+    parser.add_argument("--database-url", help="async URL порожньої бази (за замовчуванням тимчасова SQLite)")
+    parser.add_argument("--port", type=int, default=0, help="порт uvicorn (0 — вільний)")
+    parser.add_argument("--buffered", action="store_true", help="виміряти також /api/admin/pending-tasks")
+    return parser.parse_args()
+
+async def seed(rows: int) -> None:
+    from sqlalchemy import insert
+    from src.models.database import Base, User, AutomationTask
+    from src.services.database import engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__), [
+            {"id": 1, "telegram_id": "export-admin", "username": "export_admin", "is_approved": True, "is_admin": True},
+            {"id": 2, "telegram_id": "export-user", "username": "export_user", "is_approved": True, "is_admin": False},
+        ])
+    for start in range(0, rows, SEED_CHUNK):
+        async with engine.begin() as conn:
+            await conn.execute(insert(AutomationTask.__table__), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": 2,
+                    "geo_location": "US",
+                    "comments": ["Коментар для вивантаження"] * 8,
+                    "post_links": ["https://facebook.com/post/1"],
+                    "status": STATUSES[i % len(STATUSES)],
+                    "comments_posted": 8,
+                    "created_at": BASE_TIME + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + SEED_CHUNK, rows))
+            ])
+    await engine.dispose()
+
+def memory_mb(pid: int) -> dict:
+    """VmRSS та його анонімна частина (купа); файлові сторінки — це mmap SQLite"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+class RSSSampler:
+    """Пікові VmRSS та RssAnon процесу, поки виконується блок with"""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def _sample(self):
+        for key, value in memory_mb(self.pid).items():
+            self.peak[key] = max(self.peak.get(key, 0.0), value)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.before = memory_mb(self.pid)
+        self.peak = dict(self.before)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+def measure(client, pid: int, path: str, params: dict) -> dict:
+    lines = 0
+    size = 0
+    with RSSSampler(pid) as sampler:
+        started = time.perf_counter()
+        with client.stream("GET", path, params=params) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                size += len(chunk)
+                lines += chunk.count(b"\n")
+        elapsed = time.perf_counter() - started
+    return {
+        "lines": lines,
+        "mb": round(size / 1024 / 1024, 1),
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(lines / elapsed),
+        "rss_before_mb": round(sampler.before["VmRSS"], 1),
+        "rss_peak_mb": round(sampler.peak["VmRSS"], 1),
+        "anon_before_mb": round(sampler.before["RssAnon"], 1),
+        "anon_peak_mb": round(sampler.peak["RssAnon"], 1),
+        "anon_growth_mb": round(sampler.peak["RssAnon"] - sampler.before["RssAnon"], 1),
+    }
+
+def wait_until_ready(client, server: subprocess.Popen) -> None:
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            sys.exit("uvicorn завершився під час запуску")
+        try:
+            if client.get("/health/live").status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    sys.exit("uvicorn не запустився за 60 секунд")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def main():
+    args = parse_args()
+
+    temp_db = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        temp_db = tempfile.mktemp(suffix=".db")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{temp_db}"
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench-token")
+    # Той самий .env, що завантажує main.py: токен підписується ключем сервера
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    import httpx
+    from src.services.auth import create_access_token
+
+    started = time.perf_counter()
+    asyncio.run(seed(max(args.rows)))
+    seed_seconds = round(time.perf_counter() - started, 1)
+
+    port = args.port or free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL
+    )
+    report = {"seeded_rows": max(args.rows), "seed_seconds": seed_seconds, "exports": [], "buffered": None}
+    try:
+        headers = {"Authorization": f"Bearer {create_access_token({'telegram_id': 'export-admin'})}"}
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", headers=headers, timeout=None) as client:
+            wait_until_ready(client, server)
+            # Прогрів: імпорти, пул з'єднань та кеші першого запиту не враховуються
+            for export_format in args.format:
+                measure(client, server.pid, "/api/admin/export/tasks", {
+                    "format": export_format, "created_to": (BASE_TIME + timedelta(seconds=1000)).isoformat()
+                })
+            for rows in sorted(args.rows):
+                for export_format in args.format:
+                    result = measure(client, server.pid, "/api/admin/export/tasks", {
+                        "format": export_format,
+                        "created_to": (BASE_TIME + timedelta(seconds=rows)).isoformat(),
+                    })
+                    report["exports"].append({"rows": rows, "format": export_format, **result})
+            if args.buffered:
+                # Один JSON-масив без переносів рядків: lines/rows_per_s не мають сенсу
+                buffered = measure(client, server.pid, "/api/admin/pending-tasks", {})
+                del buffered["lines"], buffered["rows_per_s"]
+                report["buffered"] = {"path": "/api/admin/pending-tasks", **buffered}
+    finally:
+        server.terminate()
+        server.wait()
+        if temp_db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(temp_db + suffix):
+                    os.unlink(temp_db + suffix)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
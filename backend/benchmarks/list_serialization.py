@@ -0,0 +1,130 @@
+"""Порівняння шляхів читання списків: ORM + Pydantic проти Core-рядків + orjson.
+
+Запуск (з папки backend/):
+
+    python -m benchmarks.list_serialization --rows 10000
+
+"orm" відтворює попередній шлях маршрутів: select(AutomationTask) з
+identity map, копіювання полів у TaskResponse та повторна валідація
+response_model з jsonable_encoder + json.dumps, як це робить FastAPI.
+"core" — поточний шлях: select(колонки) -> dict -> orjson.dumps.
+Для кожного шляху друкується медіана часу та пік виділеної пам'яті.
+"""
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import select, insert
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.database import Base, User, AutomationTask
+from src.routes.tasks import TaskResponse, TASK_LIST_COLUMNS, task_detail_columns
+from src.services.serialization import rows_to_dicts, json_bytes_response
+
+async def seed(engine, rows: int):
+    start = datetime.utcnow() - timedelta(days=30)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__), [{"id": 1, "telegram_id": "1", "username": "bench"}])
+        await conn.execute(insert(AutomationTask.__table__), [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": 1,
+                "geo_location": "US",
+                "comments": [f"Коментар номер {n} для бенчмарку" for n in range(8)],
+                "post_links": [f"https://facebook.com/post/{i}"],
+                "status": "completed",
+                "created_at": start + timedelta(seconds=i),
+                "started_at": start + timedelta(seconds=i + 1),
+                "completed_at": start + timedelta(seconds=i + 2),
+                "comments_posted": 8,
+            }
+            for i in range(rows)
+        ])
+
+async def orm_path(session_factory) -> bytes:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(AutomationTask).where(AutomationTask.user_id == 1).order_by(AutomationTask.created_at.desc())
+        )
+        items = [
+            TaskResponse(
+                id=str(task.id),
+                geo_location=task.geo_location,
+                comments=task.comments,
+                post_links=task.post_links,
+                status=task.status,
+                comments_posted=task.comments_posted,
+                created_at=task.created_at.isoformat(),
+                started_at=task.started_at.isoformat() if task.started_at else None,
+                completed_at=task.completed_at.isoformat() if task.completed_at else None,
+                admin_notes=task.admin_notes,
+                error_message=task.error_message
+            )
+            for task in result.scalars().all()
+        ]
+    # Повторна валідація response_model та кодування, як у FastAPI
+    validated = TypeAdapter(List[TaskResponse]).validate_python([item.model_dump() for item in items])
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+async def core_path(session_factory) -> bytes:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(*TASK_LIST_COLUMNS, *task_detail_columns("full"))
+            .where(AutomationTask.user_id == 1)
+            .order_by(AutomationTask.created_at.desc())
+        )
+        return json_bytes_response(rows_to_dicts(result.keys(), result.all())).body
+
+async def measure(path, session_factory, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await path(session_factory)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    await path(session_factory)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "body_kb": round(len(body) / 1024, 1),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed(engine, args.rows)
+
+    report = {
+        "rows": args.rows,
+        "orm": await measure(orm_path, session_factory, args.repeat),
+        "core": await measure(core_path, session_factory, args.repeat),
+    }
+    await engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
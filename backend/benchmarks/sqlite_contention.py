@@ -0,0 +1,149 @@
+"""Конкуренція записів у SQLite: стандартний режим проти профілю WAL з одним писачем.
+
+Запуск (з папки backend/):
+
+    python -m benchmarks.sqlite_contention --writers 32 --readers 16 --duration 10
+
+"legacy" — один двигун з NullPool і rollback-журналом (як було до профілю).
+"wal" — create_sqlite_engines: WAL, PRAGMA, пул читачів та сесії
+SQLiteRoutingSession, що пишуть через одне з'єднання.
+Писачі повторюють старий шлях get_current_user: SELECT користувача,
+UPDATE last_activity, коміт. Читачі виконують запит списку завдань.
+Для кожного режиму друкується пропускна здатність, p50/p95 та кількість
+помилок "database is locked".
+"""
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import OperationalError
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.database import Base, User, AutomationTask
+from src.services.database import create_sqlite_engines, create_session_factory
+
+async def seed(engine, users: int, tasks_per_user: int):
+    start = datetime.utcnow() - timedelta(days=30)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__), [
+            {"id": i, "telegram_id": str(i), "username": f"user_{i}", "is_approved": True}
+            for i in range(1, users + 1)
+        ])
+        await conn.execute(insert(AutomationTask.__table__), [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "geo_location": "US",
+                "comments": ["Коментар"] * 8,
+                "post_links": ["https://facebook.com/post/1"],
+                "status": "completed",
+                "comments_posted": 8,
+                "created_at": start + timedelta(minutes=n),
+            }
+            for user_id in range(1, users + 1)
+            for n in range(tasks_per_user)
+        ])
+
+async def writer(session_factory, users: int, deadline: float, stats: dict):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        user_id = rng.randint(1, users)
+        started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                await db.execute(select(User).where(User.id == user_id))
+                await db.execute(
+                    update(User).where(User.id == user_id).values(last_activity=datetime.utcnow())
+                )
+                await db.commit()
+            stats["write_ms"].append((time.perf_counter() - started) * 1000)
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            stats["locked"] += 1
+
+async def reader(session_factory, users: int, deadline: float, stats: dict):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                await db.execute(
+                    select(AutomationTask.id, AutomationTask.status, AutomationTask.created_at)
+                    .where(AutomationTask.user_id == rng.randint(1, users))
+                    .order_by(AutomationTask.created_at.desc())
+                    .limit(50)
+                )
+            stats["read_ms"].append((time.perf_counter() - started) * 1000)
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            stats["locked"] += 1
+
+def summarize(values, elapsed: float) -> dict:
+    if not values:
+        return {"ops_per_s": 0}
+    values.sort()
+    return {
+        "ops_per_s": round(len(values) / elapsed, 1),
+        "p50_ms": round(statistics.median(values), 2),
+        "p95_ms": round(values[int(len(values) * 0.95) - 1], 2),
+    }
+
+async def run_mode(mode: str, args) -> dict:
+    path = tempfile.mktemp(suffix=".db")
+    engine, writer_engine = create_sqlite_engines(f"sqlite+aiosqlite:///{path}", wal=(mode == "wal"))
+    session_factory = create_session_factory(engine, writer_engine)
+    await seed(writer_engine or engine, args.users, args.tasks_per_user)
+
+    stats = {"write_ms": [], "read_ms": [], "locked": 0}
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(writer(session_factory, args.users, deadline, stats) for _ in range(args.writers)),
+        *(reader(session_factory, args.users, deadline, stats) for _ in range(args.readers)),
+    )
+    elapsed = time.perf_counter() - started
+
+    await engine.dispose()
+    if writer_engine is not None:
+        await writer_engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+    return {
+        "writes": summarize(stats["write_ms"], elapsed),
+        "reads": summarize(stats["read_ms"], elapsed),
+        "locked_errors": stats["locked"],
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks-per-user", type=int, default=20)
+    args = parser.parse_args()
+
+    report = {
+        "writers": args.writers,
+        "readers": args.readers,
+        "legacy": await run_mode("legacy", args),
+        "wal": await run_mode("wal", args),
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+"""Продакшн-запуск API: gunicorn з кількома воркерами uvicorn (uvloop + httptools).
+
+Запуск (з папки backend/):
+
+    python serve.py
+
+Застосунок імпортується один раз у головному процесі (preload) і
+успадковується воркерами через fork. Схема БД (таблиці, нові колонки,
+індекси) готується там же один раз до запуску воркерів; решта lifespan
+(пули з'єднань, фонові сервіси) виконується в кожному воркері окремо.
+
+З SQLite запускається лише один воркер: єдиний процес-записувач і
+розсилка подій SSE в межах процесу розраховані на один процес.
+
+На SIGTERM воркер перестає приймати з'єднання, завершує потоки SSE,
+чекає на запити в роботі до GRACEFUL_TIMEOUT - SHUTDOWN_FLUSH_SECONDS
+секунд, після чого lifespan записує накопичені last_activity і закриває
+пули з'єднань (engine.dispose()) до того, як gunicorn завершить воркер
+примусово.
+
+Змінні оточення: HOST, PORT, WEB_CONCURRENCY (кількість воркерів,
+за замовчуванням кількість CPU; для SQLite завжди 1), GRACEFUL_TIMEOUT, SHUTDOWN_FLUSH_SECONDS,
+WORKER_TIMEOUT, KEEPALIVE, MAX_REQUESTS, MAX_REQUESTS_JITTER,
+FORWARDED_ALLOW_IPS, PROMETHEUS_MULTIPROC_DIR.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Скільки gunicorn чекає на воркер після SIGTERM, перш ніж вбити його
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Частина GRACEFUL_TIMEOUT, залишена на shutdown lifespan (запис активності, dispose)
+SHUTDOWN_FLUSH_SECONDS = int(os.getenv("SHUTDOWN_FLUSH_SECONDS", "5"))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+# Перезапуск воркера після N запитів (0 — вимкнено)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+def prepare_metrics_dir() -> bool:
+    """Каталог метрик, спільний для воркерів (до імпорту prometheus_client).
+
+    Файли попереднього запуску видаляються: інакше лічильники мертвих
+    процесів додавалися б до нових. Повертає True для тимчасового каталогу.
+    """
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return False
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="commentflow-metrics-")
+    return True
+
+METRICS_DIR_IS_TEMP = prepare_metrics_dir()
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.arbiter import Arbiter
+from prometheus_client import multiprocess
+from uvicorn.server import Server
+from uvicorn.workers import UvicornWorker
+
+from main import app, init_database
+from src.services.database import DATABASE_URL, close_database, engine, read_engine, writer_engine
+from src.services.task_events import task_event_broker
+
+class DrainingServer(Server):
+    """Сервер uvicorn, що на сигнал зупинки одразу завершує потоки SSE.
+
+    Потоки подій нескінченні й інакше тримали б воркер до кінця
+    таймауту плавної зупинки; звичайні запити дочікуються як є.
+    """
+
+    def handle_exit(self, sig, frame) -> None:
+        if not self.should_exit:
+            task_event_broker.close_subscribers()
+        super().handle_exit(sig, frame)
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Запити в роботі чекають не довше, ніж дозволяє gunicorn, з запасом на shutdown lifespan
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - SHUTDOWN_FLUSH_SECONDS)
+
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+def post_fork(server, worker) -> None:
+    # Пули з'єднань не діляться між процесами: успадковані від майстра
+    # з'єднання покидаються без закриття (їх закриє сам майстер)
+    for async_engine in {engine, read_engine, writer_engine} - {None}:
+        async_engine.sync_engine.dispose(close=False)
+
+def child_exit(server, worker) -> None:
+    # Gauge з livesum не повинні враховувати завершений воркер
+    multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server) -> None:
+    if METRICS_DIR_IS_TEMP:
+        shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+
+async def prepare_database() -> None:
+    """DDL один раз у головному процесі; його з'єднання закриваються до fork"""
+    await init_database()
+    await close_database()
+
+def worker_count() -> int:
+    if DATABASE_URL.startswith("sqlite"):
+        if WEB_CONCURRENCY > 1:
+            print(f"⚠️ SQLite підтримує лише один воркер, WEB_CONCURRENCY={WEB_CONCURRENCY} проігноровано")
+        return 1
+    return WEB_CONCURRENCY
+
+class ProductionApplication(BaseApplication):
+    def __init__(self, application, options: dict):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def main():
+    workers = worker_count()
+    asyncio.run(prepare_database())
+
+    print(f"🚀 Запуск {workers} воркерів на {HOST}:{PORT}")
+    ProductionApplication(app, {
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        # Рядок, а не клас: gunicorn виводить його в журнал; модуль уже в sys.modules
+        "worker_class": f"{__name__}.ProductionWorker",
+        "preload_app": True,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        "on_exit": on_exit,
+        "accesslog": "-",
+    }).run()
+
+if __name__ == "__main__":
+    main()
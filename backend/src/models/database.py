@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey, Index, bindparam, text, inspect, select, update
+)
+from sqlalchemy.schema import CreateColumn, CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 Base = declarative_base()
 
@@ -15,13 +19,30 @@ class User(Base):
     username = Column(String, nullable=True)
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
+    # Ключі префіксного пошуку (search_key): lower() у SQLite не знає кирилиці
+    username_lc = Column(String, nullable=True)
+    first_name_lc = Column(String, nullable=True)
     is_approved = Column(Boolean, default=False)  # Чи схвалений користувач
     is_admin = Column(Boolean, default=False)     # Чи є адміністратором
     created_at = Column(DateTime, default=datetime.utcnow)
     last_activity = Column(DateTime, default=datetime.utcnow)
+    tasks_count = Column(Integer, nullable=False, default=0, server_default="0")  # Денормалізована кількість завдань
     
     # Зв'язки
     tasks = relationship("AutomationTask", back_populates="user")
+    
+    __table_args__ = (
+        # Список користувачів в адмін-панелі: ORDER BY created_at DESC
+        Index("ix_users_created_at", "created_at"),
+    )
+
+# Префіксний пошук в адмін-панелі: username_lc LIKE 'abc%' (Postgres) або діапазон (SQLite)
+Index("ix_users_username_lc", User.username_lc, postgresql_ops={"username_lc": "text_pattern_ops"})
+Index("ix_users_first_name_lc", User.first_name_lc, postgresql_ops={"first_name_lc": "text_pattern_ops"})
+
+def search_key(value: Optional[str]) -> Optional[str]:
+    """Значення для username_lc/first_name_lc (Unicode-регістр рахує Python)"""
+    return value.lower() if value is not None else None
 
 class FacebookAccount(Base):
     """Facebook аккаунти для автоматизації"""
@@ -41,6 +62,13 @@ class FacebookAccount(Base):
     
     # Зв'язки
     tasks = relationship("AutomationTask", back_populates="facebook_account")
+    
+    __table_args__ = (
+        # Пошук доступних акаунтів для гео при створенні завдання та в статистиці
+        Index("ix_facebook_accounts_geo_active", "geo_location", "is_active", "is_blocked"),
+        # Перевірка унікальності імені акаунта
+        Index("ix_facebook_accounts_account_name", "account_name"),
+    )
 
 class AutomationTask(Base):
     """Завдання автоматизації від байєрів"""
@@ -73,6 +101,23 @@ class AutomationTask(Base):
     # Зв'язки
     user = relationship("User", back_populates="tasks")
     facebook_account = relationship("FacebookAccount", back_populates="tasks")
+    
+    __table_args__ = (
+        # Keyset-пагінація завдань користувача: WHERE user_id = ? ORDER BY created_at, id
+        Index("ix_automation_tasks_user_created", "user_id", "created_at", "id"),
+        # Черга на схвалення: WHERE status = 'pending_approval' ORDER BY created_at.
+        # Частковий індекс містить лише рядки, що очікують, тому залишається малим
+        Index(
+            "ix_automation_tasks_pending_created", "created_at", "id",
+            postgresql_where=text("status = 'pending_approval'"),
+            sqlite_where=text("status = 'pending_approval'")
+        ),
+        # Експорт за діапазоном дат: WHERE created_at >= ? ORDER BY created_at, id
+        Index("ix_automation_tasks_created", "created_at", "id"),
+        # Очищення за політикою зберігання: WHERE status = ? AND created_at < ? ORDER BY created_at, id;
+        # префікс status обслуговує і GROUP BY status у статистиці
+        Index("ix_automation_tasks_status_created", "status", "created_at", "id"),
+    )
 
 class TaskExecutionLog(Base):
     """Детальний лог виконання завдань"""
@@ -85,6 +130,13 @@ class TaskExecutionLog(Base):
     message = Column(Text, nullable=False)           # Повідомлення
     details = Column(JSON, nullable=True)            # Додаткові деталі
     timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Лог конкретного завдання в хронологічному порядку
+        Index("ix_task_execution_logs_task_timestamp", "task_id", "timestamp", "id"),
+        # Очищення старих логів: WHERE timestamp < ? ORDER BY timestamp, id
+        Index("ix_task_execution_logs_timestamp", "timestamp", "id"),
+    )
 
 class SystemSettings(Base):
     """Системні налаштування"""
@@ -95,4 +147,151 @@ class SystemSettings(Base):
     value = Column(JSON, nullable=False)
     description = Column(Text, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow)
-    updated_by = Column(Integer, ForeignKey("users.id"), nullable=True)
\ No newline at end of file
+    updated_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+
+class UserTokenEpoch(Base):
+    """Епохи токенів користувачів (інвалідація JWT-claims після зміни прав)"""
+    __tablename__ = "user_token_epochs"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    epoch = Column(Integer, nullable=False, default=0)  # Збільшується при кожній зміні прав
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Інкрементальне оновлення кешу епох: WHERE updated_at > :last_seen
+        Index("ix_user_token_epochs_updated_at", "updated_at"),
+    )
+
+class UserDataVersion(Base):
+    """Версія даних користувача (основа ETag; збільшується при зміні його завдань чи профілю)"""
+    __tablename__ = "user_data_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class StatsCounter(Base):
+    """Лічильники для статистики адмін-панелі (оновлюються разом зі змінами даних)"""
+    __tablename__ = "stats_counters"
+    
+    key = Column(String, primary_key=True)           # users.total, users.approved, tasks.status.<status>
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TaskOutbox(Base):
+    """Повідомлення для черги Celery, записані в транзакції зміни статусу завдання"""
+    __tablename__ = "task_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    # Без зовнішнього ключа: запис переживає скасоване (видалене) завдання
+    task_id = Column(String(36), nullable=False)
+    task_name = Column(String, nullable=False)       # Ім'я завдання Celery
+    queue = Column(String, nullable=False)
+    priority = Column(Integer, nullable=False, default=5)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    celery_task_id = Column(String, nullable=True)   # ID повідомлення після публікації
+    created_at = Column(DateTime, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    published_at = Column(DateTime, nullable=True)
+    # Процес ретранслятора, що взяв запис на публікацію, і час захоплення
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Вибірка ретранслятора: WHERE published_at IS NULL ORDER BY next_attempt_at.
+        # Опубліковані рядки в індекс не потрапляють
+        Index(
+            "ix_task_outbox_unpublished", "next_attempt_at", "id",
+            postgresql_where=text("published_at IS NULL"),
+            sqlite_where=text("published_at IS NULL")
+        ),
+    )
+
+class InitDataExchange(Base):
+    """Обміни Telegram initData на токен (ліміт спільний для всіх воркерів)"""
+    __tablename__ = "init_data_exchanges"
+    
+    key = Column(String(64), primary_key=True)       # SHA-256 рядка initData (hex)
+    exchanges = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False)    # Кінець 24-годинного вікна auth_date
+    
+    __table_args__ = (
+        # Очищення прострочених записів
+        Index("ix_init_data_exchanges_expires_at", "expires_at"),
+    )
+
+def _backfill_search_key(column: str, source: str):
+    """Заповнення ключа пошуку в Python: SQL lower() у SQLite змінює лише ASCII"""
+    users = User.__table__
+
+    def backfill(connection) -> None:
+        rows = connection.execute(
+            select(users.c.id, users.c[source]).where(users.c[source].is_not(None))
+        ).all()
+        if rows:
+            connection.execute(
+                update(users).where(users.c.id == bindparam("user_id")).values({column: bindparam("key")}),
+                [{"user_id": user_id, "key": search_key(value)} for user_id, value in rows]
+            )
+    return backfill
+
+# Заповнення колонок, доданих до вже існуючих таблиць (SQL або функція від з'єднання)
+COLUMN_BACKFILLS = {
+    "users.tasks_count": (
+        "UPDATE users SET tasks_count = "
+        "(SELECT count(*) FROM automation_tasks WHERE automation_tasks.user_id = users.id)"
+    ),
+    "users.username_lc": _backfill_search_key("username_lc", "username"),
+    "users.first_name_lc": _backfill_search_key("first_name_lc", "first_name"),
+}
+
+# Індекси, прибрані з моделей: видаляються з існуючих баз
+OBSOLETE_INDEXES = (
+    # Замінені на ix_users_username_lc / ix_users_first_name_lc
+    "ix_users_username_prefix",
+    "ix_users_first_name_prefix",
+    # Префікс ix_automation_tasks_status_created
+    "ix_automation_tasks_status",
+)
+
+def create_missing_columns(connection) -> List[str]:
+    """Додавання колонок, яких немає в існуючих таблицях (create_all їх пропускає)"""
+    inspector = inspect(connection)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_spec = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_spec}"))
+            key = f"{table.name}.{column.name}"
+            backfill = COLUMN_BACKFILLS.get(key)
+            if callable(backfill):
+                backfill(connection)
+            elif backfill:
+                connection.execute(text(backfill))
+            added.append(key)
+    return added
+
+def create_missing_indexes(connection, concurrently: bool = False) -> None:
+    """Створення індексів, доданих після створення таблиць (create_all їх пропускає).
+
+    concurrently — CREATE INDEX CONCURRENTLY у Postgres: побудова на великій
+    таблиці не блокує записи, але з'єднання має бути в режимі AUTOCOMMIT.
+    """
+    for name in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            options = index.dialect_options["postgresql"]
+            options["concurrently"] = concurrently
+            try:
+                # IF NOT EXISTS: рефлексія не бачить індексів виразів у SQLite
+                connection.execute(CreateIndex(index, if_not_exists=True))
+            finally:
+                options["concurrently"] = False
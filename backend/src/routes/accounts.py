@@ -6,8 +6,9 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from src.services.auth import get_current_admin_user
-from src.services.database import get_db_session
+from src.services.database import get_db_session, get_read_session
 from src.services.encryption import credential_manager
+from src.services.serialization import json_bytes_response
 from src.models.database import FacebookAccount
 
 router = APIRouter()
@@ -109,7 +110,7 @@ async def create_facebook_account(
 async def get_facebook_accounts(
     geo_location: Optional[str] = None,
     admin_user = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Отримання списку Facebook акаунтів"""
     
@@ -123,28 +124,29 @@ async def get_facebook_accounts(
     result = await db.execute(query)
     accounts = result.scalars().all()
     
-    return [
-        FacebookAccountResponse(
-            id=account.id,
-            account_name=account.account_name,
-            geo_location=account.geo_location,
-            is_active=account.is_active,
-            is_blocked=account.is_blocked,
-            has_cookies=bool(account.encrypted_cookies),
-            has_token=bool(account.encrypted_token),
-            has_proxy=bool(account.proxy_info),
-            last_used=account.last_used.isoformat() if account.last_used else None,
-            created_at=account.created_at.isoformat(),
-            notes=account.notes
-        )
+    # Готові словники: без jsonable_encoder і валідації response_model на кожен акаунт
+    return json_bytes_response([
+        {
+            "id": account.id,
+            "account_name": account.account_name,
+            "geo_location": account.geo_location,
+            "is_active": account.is_active,
+            "is_blocked": account.is_blocked,
+            "has_cookies": bool(account.encrypted_cookies),
+            "has_token": bool(account.encrypted_token),
+            "has_proxy": bool(account.proxy_info),
+            "last_used": account.last_used.isoformat() if account.last_used else None,
+            "created_at": account.created_at.isoformat(),
+            "notes": account.notes
+        }
         for account in accounts
-    ]
+    ])
 
 @router.get("/{account_id}", response_model=FacebookAccountResponse)
 async def get_facebook_account(
     account_id: int,
     admin_user = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Отримання конкретного Facebook акаунта"""
     
@@ -269,7 +271,7 @@ async def delete_facebook_account(
 async def test_facebook_account_connection(
     account_id: int,
     admin_user = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Тестування з'єднання з Facebook акаунтом"""
     
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, exists, union_all
 from datetime import datetime
+from typing import Optional, Tuple
 
-from src.services.auth import verify_telegram_auth, create_access_token, get_current_user
-from src.services.database import get_db_session
-from src.models.database import User
+from src.services.auth import verify_telegram_auth, create_access_token, build_user_claims, get_current_user
+from src.services.database import get_db_session, dialect_insert
+from src.services.activity import activity_tracker
+from src.services.token_epochs import read_token_epoch
+from src.services.stats_counters import record_user_created
+from src.services.data_versions import check_etag, content_etag, PRIVATE_CACHE_CONTROL
+from src.services.serialization import json_bytes_response
+from src.models.database import User, search_key
 
 router = APIRouter()
 
@@ -26,6 +32,72 @@ class UserInfo(BaseModel):
     is_approved: bool
     is_admin: bool
 
+def _profile_changed(excluded):
+    return or_(
+        User.username.is_distinct_from(excluded.username),
+        User.first_name.is_distinct_from(excluded.first_name),
+        User.last_name.is_distinct_from(excluded.last_name)
+    )
+
+async def upsert_telegram_user(
+    db: AsyncSession,
+    telegram_id: str,
+    username: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str]
+) -> Tuple[User, bool]:
+    """Створення або оновлення користувача одним INSERT ... ON CONFLICT.
+
+    DO UPDATE спрацьовує лише якщо змінились поля профілю, тож повторні
+    входи без змін нічого не записують. Повертає (користувач, створений).
+    Новий рядок розпізнається за created_at, переданим у VALUES.
+    """
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, User).values(
+        telegram_id=telegram_id,
+        username=username,
+        first_name=first_name,
+        last_name=last_name,
+        username_lc=search_key(username),
+        first_name_lc=search_key(first_name),
+        is_approved=False,  # Потрібне схвалення адміністратора
+        is_admin=False,
+        created_at=now,
+        last_activity=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            "username": stmt.excluded.username,
+            "first_name": stmt.excluded.first_name,
+            "last_name": stmt.excluded.last_name,
+            "username_lc": stmt.excluded.username_lc,
+            "first_name_lc": stmt.excluded.first_name_lc
+        },
+        where=_profile_changed(stmt.excluded)
+    )
+    
+    if db.get_bind().dialect.name == "postgresql":
+        # Без змін DO UPDATE нічого не повертає: рядок додається з того ж запиту
+        upserted = stmt.returning(*User.__table__.c).cte("upserted")
+        unchanged = select(User.__table__).where(
+            User.telegram_id == telegram_id,
+            ~exists(select(upserted.c.id))
+        )
+        query = select(User).from_statement(union_all(select(upserted), unchanged))
+    else:
+        # SQLite не підтримує DML у CTE: незмінений профіль дочитується окремим SELECT
+        query = stmt.returning(User)
+    user = (await db.execute(query, execution_options={"populate_existing": True})).scalar_one_or_none()
+    if user is None:
+        # Незмінений профіль (SQLite) або рядок, щойно вставлений паралельним входом:
+        # знімок попереднього оператора його не бачить, новий оператор — бачить
+        user = (await db.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )).scalar_one()
+    
+    return user, user.created_at == now
+
 @router.post("/login", response_model=AuthResponse)
 async def login(
     auth_request: TelegramAuthRequest,
@@ -33,73 +105,80 @@ async def login(
 ):
     """Авторизація користувача через Telegram Mini App"""
     
-    # Перевірка даних Telegram
-    telegram_user = verify_telegram_auth(auth_request.initData)
-    
+    # Перевірка даних Telegram (та облік обміну в поточній транзакції)
+    verified = await verify_telegram_auth(auth_request.initData, db)
+    telegram_user = verified.user_data
     telegram_id = str(telegram_user.get("id"))
-    username = telegram_user.get("username")
-    first_name = telegram_user.get("first_name")
-    last_name = telegram_user.get("last_name")
     
-    # Пошук існуючого користувача
-    result = await db.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
+    # Епоха з БД до рядка користувача: кеш процесу може відставати, а права
+    # схвалення, закомічені між читаннями, потраплять у токен лише зі старою епохою
+    epoch = await read_token_epoch(db, telegram_id)
     
-    # Створення нового користувача якщо не існує
-    if not user:
-        user = User(
-            telegram_id=telegram_id,
-            username=username,
-            first_name=first_name,
-            last_name=last_name,
-            is_approved=False,  # Потрібне схвалення адміністратора
-            is_admin=False
-        )
-        db.add(user)
+    if verified.claims is not None and verified.claims["ep"] == epoch:
+        # Повтор того самого initData: права не змінювались, профіль той самий —
+        # токен з claims першого входу, записується лише лічильник обмінів
+        claims = verified.claims
         await db.commit()
-        await db.refresh(user)
-        
-        print(f"📝 Новий користувач зареєстрований: {username} (ID: {telegram_id})")
+        activity_tracker.touch(claims["uid"])
     else:
-        # Оновлення даних існуючого користувача
-        user.username = username
-        user.first_name = first_name
-        user.last_name = last_name
-        user.last_activity = datetime.utcnow()
+        username = telegram_user.get("username")
+        # Один upsert замість SELECT + INSERT/UPDATE; профіль переписується лише при змінах
+        user, created = await upsert_telegram_user(
+            db, telegram_id, username, telegram_user.get("first_name"), telegram_user.get("last_name")
+        )
+        if created:
+            await record_user_created(db)
+            print(f"📝 Новий користувач зареєстрований: {username} (ID: {telegram_id})")
         await db.commit()
+        activity_tracker.touch(user.id, stored=user.last_activity)
+        claims = build_user_claims(user, epoch)
+        verified.claims = claims
     
-    # Створення JWT токена
-    access_token = create_access_token(
-        data={"telegram_id": user.telegram_id}
-    )
+    # Створення JWT токена з правами користувача та епохою з тієї ж транзакції
+    access_token = create_access_token(data=claims)
     
     return AuthResponse(
         access_token=access_token,
         token_type="bearer",
         user={
-            "id": user.id,
-            "telegram_id": user.telegram_id,
-            "username": user.username,
-            "first_name": user.first_name,
-            "is_approved": user.is_approved,
-            "is_admin": user.is_admin
+            "id": claims["uid"],
+            "telegram_id": claims["telegram_id"],
+            "username": claims["username"],
+            "first_name": claims["first_name"],
+            "is_approved": claims["is_approved"],
+            "is_admin": claims["is_admin"]
         }
     )
 
 @router.get("/me", response_model=UserInfo)
 async def get_current_user_info(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Отримання інформації про поточного користувача"""
-    return UserInfo(
-        id=current_user.id,
-        telegram_id=current_user.telegram_id,
-        username=current_user.username,
-        first_name=current_user.first_name,
-        is_approved=current_user.is_approved,
-        is_admin=current_user.is_admin
+    
+    # ETag з самих полів: відповідь будується без звернення до БД
+    etag = content_etag(
+        current_user.id,
+        current_user.telegram_id,
+        current_user.username,
+        current_user.first_name,
+        current_user.is_approved,
+        current_user.is_admin
+    )
+    check_etag(request, response, etag)
+    
+    return json_bytes_response(
+        {
+            "id": current_user.id,
+            "telegram_id": current_user.telegram_id,
+            "username": current_user.username,
+            "first_name": current_user.first_name,
+            "is_approved": current_user.is_approved,
+            "is_admin": current_user.is_admin
+        },
+        headers={"ETag": etag, "Cache-Control": PRIVATE_CACHE_CONTROL}
     )
 
 @router.post("/check-approval")
@@ -0,0 +1,78 @@
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime
+import hashlib
+from typing import Iterable
+
+from src.models.database import User, UserDataVersion
+from src.services.auth import get_current_user
+from src.services.database import get_db_session, get_read_session, dialect_insert
+
+# Відповіді залежать від користувача: кешувати лише в браузері та завжди перевіряти
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+# Статичні довідники змінюються лише з новим релізом
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+async def bump_data_version(db: AsyncSession, user_id: int) -> None:
+    """Збільшення версії даних користувача в поточній транзакції"""
+    stmt = dialect_insert(db, UserDataVersion).values(
+        user_id=user_id, version=1, updated_at=datetime.utcnow()
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserDataVersion.user_id],
+        set_={
+            "version": UserDataVersion.version + 1,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабке порівняння ETag з заголовком If-None-Match"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates: Iterable[str] = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """304 без тіла, якщо клієнт має актуальну версію; інакше ETag у відповідь"""
+    headers = {"ETag": etag, "Cache-Control": PRIVATE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+async def _check_user_data_etag(request: Request, response: Response, user_id: int, db: AsyncSession) -> str:
+    version = await get_data_version(db, user_id)
+    etag = f'W/"u{user_id}-v{version}"'
+    check_etag(request, response, etag)
+    return etag
+
+async def user_data_etag(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
+) -> str:
+    """Залежність для GET-маршрутів завдань: один запит версії замість важкого читання"""
+    return await _check_user_data_etag(request, response, current_user.id, db)
+
+async def primary_user_data_etag(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session)
+) -> str:
+    """Те саме для маршрутів на основній базі: версія не відстає від їхніх даних"""
+    return await _check_user_data_etag(request, response, current_user.id, db)
+
+def content_etag(*parts) -> str:
+    """ETag з вмісту, для відповідей, що будуються без звернення до БД"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
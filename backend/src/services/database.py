@@ -1,36 +1,163 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.expression import TextClause
+from sqlalchemy import event
 import os
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional, Tuple
+
+from src.services.sql_metrics import instrument_engine
+from src.services.metrics import TimedAsyncQueuePool, register_pool_metrics
 
 # Отримання URL бази даних з змінних середовища
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./automation.db")
+# Окрема база лише для читання (репліка); без неї читання йдуть на основну
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# Логування SQL запитів (лише для розробки)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
 
-# Створення асинхронного двигуна
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite configuration
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=True,  # Логування SQL запитів (вимкнути в продакшені)
-        connect_args={"check_same_thread": False}
+# Профіль SQLite: WAL, PRAGMA при підключенні, пул читачів та один з'єднання-писач
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() == "true"
+# Кількість з'єднань-читачів, що лишаються відкритими між запитами
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "5"))
+# Скільки сесія чекає на з'єднання-писача, перш ніж отримати помилку
+SQLITE_WRITE_TIMEOUT_SECONDS = float(os.getenv("SQLITE_WRITE_TIMEOUT_SECONDS", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Налаштування кожного нового з'єднання SQLite"""
+    cursor = dbapi_connection.cursor()
+    # WAL: читачі не блокують писача і навпаки; NORMAL безпечний для WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # Від'ємне значення — розмір у КіБ, а не в сторінках
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_sqlite_engines(url: str, wal: bool = SQLITE_WAL) -> Tuple[AsyncEngine, Optional[AsyncEngine]]:
+    """Двигуни SQLite: (читання, запис) або (спільний, None) без профілю WAL.
+
+    Двигун запису має пул з одного з'єднання: сесії, що пишуть, чекають
+    на нього в черзі asyncio замість змагання за блокування файлу.
+    """
+    connect_args = {"check_same_thread": False}
+    if not wal or ":memory:" in url:
+        return create_async_engine(url, echo=SQL_ECHO, connect_args=connect_args), None
+
+    read_engine = create_async_engine(
+        url,
+        echo=SQL_ECHO,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        # Без ліміту: сесія тримає з'єднання-читача, поки чекає на писача,
+        # а обмежений пул читачів тоді вичерпується чергою писачів
+        max_overflow=-1,
+        connect_args=connect_args
     )
-else:
-    # PostgreSQL configuration
-    engine = create_async_engine(
-        DATABASE_URL,
-        echo=True,  # Логування SQL запитів (вимкнути в продакшені)
+    write_engine = create_async_engine(
+        url,
+        echo=SQL_ECHO,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=SQLITE_WRITE_TIMEOUT_SECONDS,
+        connect_args=connect_args
+    )
+    for sqlite_engine in (read_engine, write_engine):
+        event.listen(sqlite_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return read_engine, write_engine
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE", "REPLACE")
+    return bool(getattr(clause, "is_dml", False))
+
+class SQLiteRoutingSession(Session):
+    """Сесія, що читає через пул читачів, а пише через єдине з'єднання-писача.
+
+    Після першого запису транзакція лишається на писачі до коміту/відкату,
+    тож подальші читання бачать власні незакомічені зміни.
+    """
+
+    def __init__(self, *args, writer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("use_writer") or self._flushing or _is_write(clause):
+            self.info["use_writer"] = True
+            return self.writer
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+@event.listens_for(SQLiteRoutingSession, "after_transaction_end")
+def _release_writer(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("use_writer", None)
+
+def create_session_factory(engine: AsyncEngine, writer_engine: Optional[AsyncEngine] = None) -> async_sessionmaker:
+    if writer_engine is None:
+        return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=SQLiteRoutingSession,
+        writer=writer_engine.sync_engine,
+        expire_on_commit=False
+    )
+
+def create_postgres_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=SQL_ECHO,
+        poolclass=TimedAsyncQueuePool,
         pool_size=20,
         max_overflow=0,
         pool_pre_ping=True,
         pool_recycle=300,
     )
 
-# Створення фабрики сесій
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+# Створення асинхронного двигуна
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite configuration
+    engine, writer_engine = create_sqlite_engines(DATABASE_URL)
+else:
+    # PostgreSQL configuration
+    engine = create_postgres_engine(DATABASE_URL)
+    writer_engine = None
+
+# Двигун читання: репліка з DATABASE_READ_URL або основний двигун
+if DATABASE_READ_URL and DATABASE_READ_URL != DATABASE_URL:
+    if DATABASE_READ_URL.startswith("sqlite"):
+        read_engine, _ = create_sqlite_engines(DATABASE_READ_URL, wal=False)
+    else:
+        read_engine = create_postgres_engine(DATABASE_READ_URL)
+else:
+    read_engine = engine
+
+# Облік кількості та часу SQL-запитів
+instrument_engine(engine.sync_engine)
+register_pool_metrics(engine.sync_engine)
+if writer_engine is not None:
+    instrument_engine(writer_engine.sync_engine)
+if read_engine is not engine:
+    instrument_engine(read_engine.sync_engine)
+    register_pool_metrics(read_engine.sync_engine, role="replica")
+
+# Створення фабрик сесій
+AsyncSessionLocal = create_session_factory(engine, writer_engine)
+if read_engine is engine:
+    # Без репліки: та сама фабрика (у SQLite WAL читання й так ідуть пулом читачів)
+    ReadSessionLocal = AsyncSessionLocal
+else:
+    ReadSessionLocal = create_session_factory(read_engine)
 
 # Базовий клас для моделей
 Base = declarative_base()
@@ -46,6 +173,24 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сесія для маршрутів лише на читання (репліка, якщо налаштована).
+
+    Репліка може відставати від основної бази: маршрути, що мають бачити
+    щойно записані дані того ж запиту, лишаються на get_db_session.
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def dialect_insert(db: AsyncSession, table):
+    """INSERT з підтримкою ON CONFLICT для діалекту, до якого прив'язана сесія"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
 async def init_database():
     """Ініціалізація бази даних"""
     from src.models.database import Base
@@ -58,4 +203,8 @@ async def init_database():
 async def close_database():
     """Закриття з'єднання з базою даних"""
     await engine.dispose()
+    if writer_engine is not None:
+        await writer_engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     print("🔌 З'єднання з базою даних закрито")
\ No newline at end of file
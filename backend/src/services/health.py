@@ -0,0 +1,165 @@
+from sqlalchemy import text
+import redis.asyncio as redis
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from src.services.database import engine, read_engine
+from src.services.metrics import pool_status
+from src.services.queue import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# Інтервал фонових перевірок залежностей
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5"))
+# Таймаут однієї перевірки (SELECT 1 або PING)
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+# Результат старший за стільки інтервалів вважається невідомим (цикл перевірок завис)
+HEALTH_STALE_INTERVALS = 3
+# Брокер за замовчуванням лише відображається у відповіді: схвалення йдуть через
+# outbox, тож без Redis API працює і не повинен виводитись з ротації
+HEALTH_REQUIRE_BROKER = os.getenv("HEALTH_REQUIRE_BROKER", "false").lower() == "true"
+
+class HealthMonitor:
+    """Фонові перевірки БД та брокера з кешованим результатом.
+
+    Проби /health/ready лише читають останній знімок, тож частота проб
+    оркестратора не впливає на навантаження та латентність БД.
+    Готовність визначають перевірки БД (і репліки); брокер — лише з
+    HEALTH_REQUIRE_BROKER=true.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+        timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS,
+        require_broker: bool = HEALTH_REQUIRE_BROKER
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.require_broker = require_broker
+        self._checks: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._redis: Optional[redis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def _check_database(self) -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check_replica(self) -> None:
+        async with read_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check_broker(self) -> None:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                REDIS_URL,
+                socket_connect_timeout=self.timeout,
+                socket_timeout=self.timeout
+            )
+        await self._redis.ping()
+
+    async def _run_check(self, check: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        # Окрема задача: зупинка монітора не перериває перевірку посеред
+        # роботи з з'єднанням, stop() дочікується її до закриття пулів
+        task = asyncio.create_task(check())
+        self._in_flight.add(task)
+        task.add_done_callback(self._check_finished)
+        done, _ = await asyncio.wait({task}, timeout=self.timeout)
+        if not done:
+            task.cancel()
+            result = {"ok": False, "error": "TimeoutError"}
+        elif task.exception() is not None:
+            error = task.exception()
+            result = {"ok": False, "error": str(error) or type(error).__name__}
+        else:
+            result = {"ok": True}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def _check_finished(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        # Помилка перевірки, що завершилась після скасування циклу, вважається прочитаною
+        if not task.cancelled():
+            task.exception()
+
+    async def check_now(self) -> None:
+        """Одноразовий прогін усіх перевірок (паралельно)"""
+        checks = {"database": self._check_database, "broker": self._check_broker}
+        if read_engine is not engine:
+            checks["replica"] = self._check_replica
+        results = dict(zip(checks, await asyncio.gather(
+            *(self._run_check(check) for check in checks.values())
+        )))
+        for name, result in results.items():
+            previous = self._checks.get(name, {})
+            if previous.get("ok", True) and not result["ok"]:
+                logger.warning(f"Перевірка {name} не пройдена: {result['error']}")
+            elif previous.get("ok") is False and result["ok"]:
+                logger.info(f"Перевірка {name} відновлена")
+        self._checks = results
+        self._checked_at = time.time()
+
+    def is_stale(self) -> bool:
+        return self._checked_at is None or time.time() - self._checked_at > self.interval * HEALTH_STALE_INTERVALS
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Останній результат перевірок та стан пулу (без звернення до залежностей)"""
+        ready = not self.is_stale() and all(
+            check["ok"] for name, check in self._checks.items()
+            if name != "broker" or self.require_broker
+        )
+        pool = pool_status(engine.pool)
+        if pool is not None:
+            capacity = pool["size"] + max(engine.pool._max_overflow, 0)
+            pool["utilization"] = round(pool["checked_out"] / capacity, 3) if capacity else None
+        return {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": datetime.utcfromtimestamp(self._checked_at).isoformat() if self._checked_at else None,
+            "checks": self._checks,
+            "pool": pool,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_now()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка циклу перевірок здоров'я: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Запуск фонових перевірок (викликається з lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight:
+            # Перевірки, що виконувались під час зупинки, повертають з'єднання
+            # до пулу до close_database; завислі обмежені таймаутом перевірки
+            in_flight = list(self._in_flight)
+            await asyncio.wait(in_flight, timeout=self.timeout)
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+# Глобальний екземпляр монітора
+health_monitor = HealthMonitor()
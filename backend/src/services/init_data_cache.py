@@ -0,0 +1,73 @@
+from collections import OrderedDict
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+# Максимум записів у кеші перевірених initData (найстаріші витісняються)
+INIT_DATA_CACHE_MAX_ENTRIES = int(os.getenv("INIT_DATA_CACHE_MAX_ENTRIES", "10000"))
+# Скільки разів один initData можна обміняти на токен (спільно для всіх воркерів)
+INIT_DATA_MAX_EXCHANGES = int(os.getenv("INIT_DATA_MAX_EXCHANGES", "5"))
+
+class VerifiedInitData:
+    __slots__ = ("user_data", "expires_at", "claims")
+
+    def __init__(self, user_data: Dict[str, Any], expires_at: float):
+        self.user_data = user_data
+        self.expires_at = expires_at  # Unix-час, після якого initData вважається застарілим
+        # Claims токена, виданого за цим initData (заповнює login після коміту)
+        self.claims: Optional[Dict[str, Any]] = None
+
+class InitDataCache:
+    """In-process кеш перевірених Telegram initData.
+
+    Ключ — SHA-256 усього рядка initData, тож збіг можливий лише для
+    байт-у-байт того самого payload, який уже пройшов HMAC-перевірку.
+    Запис живе до закінчення 24-годинного вікна auth_date: повтори клієнта
+    не перераховують HMAC, а якщо епоха користувача не змінилась — і не
+    переписують профіль: токен видається з claims першого входу. Обміни
+    на токен рахує не кеш, а таблиця init_data_exchanges — ліміт не
+    залежить від воркера і витіснення запису.
+
+    Лічильники: hits — прийняті повтори з кешу, misses — HMAC-перевірки,
+    rejected — відмови після вичерпання ліміту обмінів.
+    """
+
+    def __init__(self, max_entries: int = INIT_DATA_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, VerifiedInitData]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    @staticmethod
+    def key(init_data: str) -> str:
+        return hashlib.sha256(init_data.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[VerifiedInitData]:
+        """Запис для initData або None, якщо його немає чи він застарів"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: str, user_data: Dict[str, Any], expires_at: float) -> VerifiedInitData:
+        entry = VerifiedInitData(user_data=user_data, expires_at=expires_at)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+# Глобальний екземпляр кешу
+init_data_cache = InitDataCache()
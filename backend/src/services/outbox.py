@@ -0,0 +1,264 @@
+from sqlalchemy import bindparam, delete, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from src.models.database import TaskOutbox
+from src.services.database import AsyncSessionLocal
+from src.services.metrics import OUTBOX_PUBLISHED
+from src.services.queue import celery_app, AUTOMATION_TASK_NAME, AUTOMATION_QUEUE, publish_task
+
+logger = logging.getLogger(__name__)
+
+# Інтервал опитування outbox (нові записи цього процесу будять ретранслятор одразу)
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+# Порожній outbox: інтервал подвоюється до цього максимуму (записи інших
+# процесів публікують їхні ретранслятори, сюди потрапляють лише залишки)
+OUTBOX_IDLE_MAX_SECONDS = float(os.getenv("OUTBOX_IDLE_MAX_SECONDS", "30"))
+# Кількість повідомлень, що публікуються за один прохід
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+# Затримка повтору після помилки брокера: 2, 4, 8 ... до максимуму
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "300"))
+# Повторні спроби підключення до брокера в межах одного проходу
+OUTBOX_CONNECT_RETRIES = 1
+# Через скільки захоплений, але не позначений запис може взяти інший процес
+# (ретранслятор-власник завершився посеред публікації)
+OUTBOX_CLAIM_TIMEOUT_SECONDS = float(os.getenv("OUTBOX_CLAIM_TIMEOUT_SECONDS", "60"))
+
+_outbox = TaskOutbox.__table__
+
+# Оновлення за ID через Core (executemany): запис, видалений скасуванням
+# завдання посеред проходу, просто не оновлюється, а не відкочує весь пакет
+_MARK_PUBLISHED = (
+    update(_outbox)
+    .where(_outbox.c.id == bindparam("message_id"))
+    .values(published_at=bindparam("published"), celery_task_id=bindparam("celery_id"))
+)
+_MARK_FAILED = (
+    update(_outbox)
+    .where(_outbox.c.id == bindparam("message_id"))
+    .values(
+        attempts=bindparam("attempt"),
+        last_error=bindparam("error"),
+        next_attempt_at=bindparam("retry_at"),
+        claimed_by=None,
+        claimed_at=None
+    )
+)
+
+async def enqueue_automation_task(db: AsyncSession, task_id: str, priority: int = 5) -> None:
+    """Запис повідомлення для черги в поточній транзакції.
+
+    Повідомлення буде опубліковане ретранслятором лише після коміту,
+    тож завдання не може лишитися схваленим без запису для черги.
+    """
+    db.add(TaskOutbox(
+        task_id=str(task_id),
+        task_name=AUTOMATION_TASK_NAME,
+        queue=AUTOMATION_QUEUE,
+        priority=priority
+    ))
+    db.sync_session.info["outbox_pending"] = True
+
+async def discard_pending_messages(db: AsyncSession, task_id: str) -> None:
+    """Видалення ще не опублікованих повідомлень завдання (у поточній транзакції)"""
+    await db.execute(
+        delete(TaskOutbox)
+        .where(TaskOutbox.task_id == str(task_id), TaskOutbox.published_at.is_(None))
+        .execution_options(synchronize_session=False)
+    )
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+def _publish_batch(messages: List[Tuple[int, str, str, str, int]]) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """Публікація пакета в потоці ретранслятора; зупиняється на першій помилці брокера"""
+    published = []
+    try:
+        # Одне з'єднання на пакет і без довгих повторів підключення kombu
+        with celery_app.connection_for_write() as connection:
+            connection.ensure_connection(max_retries=OUTBOX_CONNECT_RETRIES, interval_start=0)
+            for message_id, task_name, task_id, queue, priority in messages:
+                published.append((message_id, publish_task(task_name, [task_id], queue, priority, connection)))
+    except Exception as e:
+        return published, str(e) or type(e).__name__
+    return published, None
+
+class OutboxRelay:
+    """Фонова публікація записів task_outbox у брокер Celery.
+
+    Виклик брокера синхронний, тому виконується в окремому потоці:
+    повільний чи недоступний брокер затримує лише ретранслятор, а не
+    цикл подій. Пакет спершу захоплюється одним UPDATE ... RETURNING
+    (claimed_by/claimed_at) і комітиться, тож кілька процесів API не
+    публікують один запис одночасно і на SQLite, де FOR UPDATE немає;
+    транзакція не тримається під час звернення до брокера.
+    Доставка "щонайменше один раз" (повтор після завершення процесу
+    посеред публікації): воркер Celery бере завдання атомарним переходом
+    approved → processing і пропускає повторне повідомлення.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS,
+        batch_size: int = OUTBOX_BATCH_SIZE
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self.relay_id: Optional[str] = None
+
+    def wake(self) -> None:
+        """Позачерговий прохід (після коміту нового запису в цьому процесі)"""
+        self._wakeup.set()
+
+    async def _claim(self) -> list:
+        """Захоплення готових записів цим процесом (окрема коротка транзакція)"""
+        now = datetime.utcnow()
+        due = select(TaskOutbox.id).where(
+            TaskOutbox.published_at.is_(None),
+            TaskOutbox.next_attempt_at <= now,
+            or_(
+                TaskOutbox.claimed_at.is_(None),
+                TaskOutbox.claimed_at < now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT_SECONDS)
+            )
+        )
+        ready = (
+            due.order_by(TaskOutbox.next_attempt_at, TaskOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with AsyncSessionLocal() as session:
+            # Дешева перевірка читанням (у SQLite — пулом читачів): порожній
+            # outbox не займає з'єднання-писача і не блокує записи запитів
+            if (await session.execute(due.limit(1))).first() is None:
+                return []
+            result = await session.execute(
+                update(TaskOutbox)
+                .where(TaskOutbox.id.in_(ready.scalar_subquery()))
+                .values(claimed_by=self.relay_id, claimed_at=now)
+                .returning(
+                    TaskOutbox.id, TaskOutbox.task_name, TaskOutbox.task_id,
+                    TaskOutbox.queue, TaskOutbox.priority, TaskOutbox.attempts
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await session.commit()
+        # Порядок RETURNING не гарантований
+        return sorted(rows, key=lambda row: row.id)
+
+    async def relay_once(self) -> int:
+        """Один прохід: публікація готових записів, повертає кількість опублікованих"""
+        rows = await self._claim()
+        if not rows:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        published, error = await loop.run_in_executor(
+            self._executor, _publish_batch, [tuple(row[:5]) for row in rows]
+        )
+
+        published_at = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            if published:
+                await session.execute(_MARK_PUBLISHED, [
+                    {"message_id": message_id, "published": published_at, "celery_id": celery_task_id}
+                    for message_id, celery_task_id in published
+                ])
+            if error is not None:
+                # Неопубліковані записи пакета відкладаються з експоненційною затримкою
+                done = {message_id for message_id, _ in published}
+                await session.execute(_MARK_FAILED, [
+                    {
+                        "message_id": row.id,
+                        "attempt": row.attempts + 1,
+                        "error": error[:1000],
+                        "retry_at": published_at + _retry_delay(row.attempts + 1),
+                    }
+                    for row in rows if row.id not in done
+                ])
+            await session.commit()
+
+        OUTBOX_PUBLISHED.labels("success").inc(len(published))
+        if error is not None:
+            OUTBOX_PUBLISHED.labels("error").inc(len(rows) - len(published))
+            logger.warning(f"Брокер недоступний, {len(rows) - len(published)} повідомлень відкладено: {error}")
+        return len(published)
+
+    async def _wait_for_wakeup(self, timeout: float) -> bool:
+        """Очікування wake() або таймауту; True — ретранслятор розбудили.
+
+        asyncio.wait, а не wait_for: у Python 3.11 wait_for може поглинути
+        скасування, якщо подія настала одночасно з ним, і stop() зависає.
+        """
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+        woken = self._wakeup.is_set()
+        self._wakeup.clear()
+        return woken
+
+    async def _run(self) -> None:
+        delay = self.poll_interval
+        while True:
+            try:
+                # Повний пакет: можливо, є ще готові записи
+                while (published := await self.relay_once()) >= self.batch_size:
+                    pass
+                if published:
+                    delay = self.poll_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка ретранслятора outbox: {e}")
+            # Поки outbox порожній, опитування рідшає; wake() після коміту
+            # нового запису будить одразу і повертає звичайний інтервал
+            if await self._wait_for_wakeup(delay):
+                delay = self.poll_interval
+            else:
+                delay = min(delay * 2, OUTBOX_IDLE_MAX_SECONDS)
+
+    def start(self) -> None:
+        """Запуск ретранслятора (викликається з lifespan)"""
+        if self._task is None:
+            # Після fork (serve.py) у кожного воркера власний ідентифікатор
+            self.relay_id = f"{socket.gethostname()}:{os.getpid()}"
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-relay")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            # Не чекаємо на завислий виклик брокера: неопубліковані записи лишаються в outbox
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session) -> None:
+    if session.info.pop("outbox_pending", False):
+        outbox_relay.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_wakeup(session) -> None:
+    session.info.pop("outbox_pending", None)
+
+# Глобальний екземпляр ретранслятора
+outbox_relay = OutboxRelay()
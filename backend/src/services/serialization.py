@@ -0,0 +1,27 @@
+from fastapi.responses import JSONResponse
+import orjson
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+class FastJSONResponse(JSONResponse):
+    """JSON-відповідь на orjson (клас відповіді за замовчуванням для всього додатку).
+
+    orjson серіалізує datetime у ISO 8601 (як isoformat()), UUID — у рядок.
+    Як клас за замовчуванням вона отримує вміст після jsonable_encoder і
+    прискорює лише dumps; без цього кроку працює json_bytes_response.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[dict]:
+    """Перетворення Core-рядків на словники без ORM та Pydantic"""
+    keys = tuple(keys)
+    return [dict(zip(keys, row)) for row in rows]
+
+def json_bytes_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> FastJSONResponse:
+    """Готова JSON-відповідь: обходить jsonable_encoder та валідацію response_model"""
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
@@ -0,0 +1,108 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import os
+import random
+import time
+from typing import Iterator, Optional
+
+slow_query_logger = logging.getLogger("sql.slow")
+
+# Поріг повільного запиту та частка таких запитів, що потрапляють у лог
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SQL_SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SQL_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+
+class QueryStats:
+    """Лічильник SQL-запитів та сумарного часу БД в межах запиту/блоку"""
+
+    __slots__ = ("count", "duration_ms", "parent")
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.parent = parent
+
+    def record(self, duration_ms: float) -> None:
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration_ms += duration_ms
+            stats = stats.parent
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Облік запитів, виконаних усередині блоку (вкладені блоки теж рахуються)"""
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+@contextmanager
+def assert_query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Хелпер для тестів: падає, якщо блок виконав більше max_queries запитів
+
+        with assert_query_budget(1):
+            await client.get("/api/admin/users", headers=admin_headers)
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise AssertionError(
+            f"Перевищено бюджет SQL-запитів: {stats.count} > {max_queries}"
+        )
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Час старту на контексті виконання: після помилки (after_cursor_execute
+    # не викликається) він зникає разом з контекстом, а не лишається на з'єднанні
+    context._query_start_time = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - context._query_start_time) * 1000
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(duration_ms)
+
+    if duration_ms >= SQL_SLOW_QUERY_MS and random.random() < SQL_SLOW_QUERY_SAMPLE_RATE:
+        slow_query_logger.warning(
+            "Повільний SQL-запит (%.1f мс): %s", duration_ms, " ".join(statement.split())
+        )
+
+def instrument_engine(engine: Engine) -> None:
+    """Підключення обліку запитів до (синхронного) двигуна SQLAlchemy"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class SQLTimingMiddleware:
+    """ASGI middleware: кількість запитів та час БД у заголовку Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((
+                        b"server-timing",
+                        f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries"'.encode()
+                    ))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,32 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import NoReturn, Optional
+
+from src.models.database import AutomationTask
+
+async def raise_transition_failed(
+    db: AsyncSession,
+    task_id: str,
+    conflict_detail: str,
+    user_id: Optional[int] = None
+) -> NoReturn:
+    """Пояснення, чому умовний UPDATE/DELETE не зачепив жодного рядка.
+
+    Виконується лише на шляху помилки: 404, якщо завдання немає (або воно
+    чуже), 409, якщо статус уже змінено (зокрема паралельним запитом).
+    """
+    query = select(AutomationTask.status).where(AutomationTask.id == task_id)
+    if user_id is not None:
+        query = query.where(AutomationTask.user_id == user_id)
+    current_status = (await db.execute(query)).scalar_one_or_none()
+
+    if current_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Завдання не знайдено"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=conflict_detail
+    )
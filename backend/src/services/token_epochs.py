@@ -0,0 +1,118 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from src.models.database import User, UserTokenEpoch
+from src.services.database import AsyncSessionLocal, dialect_insert
+
+# Як часто (у секундах) перечитувати таблицю епох з БД.
+# Це верхня межа затримки відкликання токенів у інших процесах.
+EPOCH_REFRESH_SECONDS = float(os.getenv("AUTH_EPOCH_REFRESH_SECONDS", "30"))
+# Перекриття інкрементального читання: updated_at ставиться до коміту,
+# тож рядок довгої транзакції може з'явитись зі "старішим" часом
+EPOCH_REFRESH_OVERLAP = timedelta(seconds=60)
+
+class TokenEpochCache:
+    """In-process кеш епох токенів користувачів.
+
+    Рядок є в кожного схваленого користувача, тож таблиця росте з базою
+    користувачів: раз на EPOCH_REFRESH_SECONDS читаються лише рядки,
+    змінені після останнього побаченого updated_at (з перекриттям).
+    У проміжках перевірка токена не звертається до БД.
+    """
+
+    def __init__(self, refresh_seconds: float = EPOCH_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._epochs: Dict[int, int] = {}
+        self._last_seen: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    async def refresh(self) -> None:
+        """Дочитування змінених епох (один запит на процес за інтервал)"""
+        async with self._lock:
+            if not self.is_stale():
+                return
+            query = select(UserTokenEpoch.user_id, UserTokenEpoch.epoch, UserTokenEpoch.updated_at)
+            if self._last_seen is not None:
+                query = query.where(UserTokenEpoch.updated_at > self._last_seen - EPOCH_REFRESH_OVERLAP)
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(query)).all()
+            # Епохи лише зростають: повторно прочитані рядки перекриття нічого не змінюють
+            for user_id, epoch, updated_at in rows:
+                self.set(user_id, epoch)
+                if updated_at is not None and (self._last_seen is None or updated_at > self._last_seen):
+                    self._last_seen = updated_at
+            self._loaded_at = time.monotonic()
+
+    async def get(self, user_id: int) -> int:
+        """Поточна епоха користувача (0, якщо права ніколи не змінювались)"""
+        if self.is_stale():
+            await self.refresh()
+        return self._epochs.get(user_id, 0)
+
+    def set(self, user_id: int, epoch: int) -> None:
+        if epoch > self._epochs.get(user_id, 0):
+            self._epochs[user_id] = epoch
+
+    def clear(self) -> None:
+        self._epochs = {}
+        self._last_seen = None
+        self._loaded_at = 0.0
+
+async def read_token_epoch(db: AsyncSession, telegram_id: str) -> int:
+    """Епоха користувача з БД у поточній транзакції (для видачі нового токена).
+
+    Читається до рядка користувача: зміна прав комітиться разом зі
+    збільшенням епохи, тож токен отримає або старі права, або епоху,
+    не старшу за них — і ніколи нові права зі старою епохою у кеші.
+    """
+    result = await db.execute(
+        select(UserTokenEpoch.epoch)
+        .join(User, User.id == UserTokenEpoch.user_id)
+        .where(User.telegram_id == telegram_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+async def bump_token_epoch(db: AsyncSession, user_id: int) -> int:
+    """Збільшення епохи користувача в поточній транзакції.
+
+    Усі раніше видані токени стають застарілими: при наступному запиті
+    права користувача буде перечитано з БД. Коміт виконує викликач;
+    кеш цього процесу отримує нову епоху лише після успішного коміту.
+    """
+    # Один upsert: паралельні зміни прав користувача без рядка епохи не конфліктують
+    stmt = dialect_insert(db, UserTokenEpoch).values(
+        user_id=user_id, epoch=1, updated_at=datetime.utcnow()
+    )
+    result = await db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserTokenEpoch.user_id],
+        set_={
+            "epoch": UserTokenEpoch.epoch + 1,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ).returning(UserTokenEpoch.epoch))
+    epoch = result.scalar_one()
+
+    db.sync_session.info.setdefault("token_epochs", {})[user_id] = epoch
+    return epoch
+
+@event.listens_for(Session, "after_commit")
+def _publish_epochs(session) -> None:
+    for user_id, epoch in session.info.pop("token_epochs", {}).items():
+        token_epoch_cache.set(user_id, epoch)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_epochs(session) -> None:
+    session.info.pop("token_epochs", None)
+
+# Глобальний екземпляр кешу
+token_epoch_cache = TokenEpochCache()
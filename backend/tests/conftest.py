@@ -0,0 +1,49 @@
+"""Спільне налаштування тестів: тимчасова база до імпорту додатку.
+
+Запуск (з папки backend/):
+
+    python -m pytest tests
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests
+
+Гонки станів завдань по-справжньому перевіряються лише на Postgres:
+у SQLite всі записи проходять через одне з'єднання-писача.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+_temp_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL",
+    f"sqlite+aiosqlite:///{os.path.join(_temp_dir.name, 'test.db')}"
+)
+
+import httpx
+
+from main import app
+
+@pytest.fixture(scope="session")
+def run_app():
+    """Виконання корутини test_body(client) всередині lifespan додатку.
+
+    Один цикл подій на всю сесію: фонові служби додатку (трекер активності,
+    брокер подій) прив'язані до циклу, в якому їх запущено.
+    """
+    loop = asyncio.new_event_loop()
+    lifespan = app.router.lifespan_context(app)
+    # Помилки додатку повертаються як 500, а не переривають тест
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    client = httpx.AsyncClient(transport=transport, base_url="http://test")
+    loop.run_until_complete(lifespan.__aenter__())
+
+    yield lambda test_body: loop.run_until_complete(test_body(client))
+
+    loop.run_until_complete(client.aclose())
+    loop.run_until_complete(lifespan.__aexit__(None, None, None))
+    loop.close()
+    _temp_dir.cleanup()
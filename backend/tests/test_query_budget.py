@@ -0,0 +1,54 @@
+"""Бюджет SQL-запитів гарячих списків: кількість не росте з розміром сторінки (без N+1)"""
+from src.models.database import User, AutomationTask
+from src.services.auth import create_access_token, build_user_claims
+from src.services.database import AsyncSessionLocal
+from src.services.sql_metrics import assert_query_budget
+from src.services.token_epochs import token_epoch_cache
+
+async def seed_admin_with_tasks(tasks: int = 5, users: int = 5):
+    """Адмін із завданнями та кілька інших користувачів; заголовки з claims-токеном"""
+    async with AsyncSessionLocal() as db:
+        admin = User(telegram_id="budget-admin", username="budget_admin", is_approved=True, is_admin=True)
+        db.add(admin)
+        db.add_all(User(telegram_id=f"budget-user-{i}", username=f"budget_user_{i}") for i in range(users))
+        await db.flush()
+        db.add_all(
+            AutomationTask(
+                user_id=admin.id,
+                geo_location="US",
+                comments=[f"budget {i}"] * 8,
+                post_links=[f"https://facebook.com/post/{i}"],
+                status="pending_approval"
+            )
+            for i in range(tasks)
+        )
+        await db.commit()
+    # Епоха 0 збігається з кешем: авторизація йде швидким шляхом без БД
+    token = create_access_token(build_user_claims(admin, 0))
+    return {"Authorization": f"Bearer {token}"}
+
+async def warm_up(client, headers):
+    # Перше читання кешу епох само виконує запит; він не належить маршрутам
+    await token_epoch_cache.get(0)
+    response = await client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+
+def test_list_endpoints_query_budget(run_app):
+    async def body(client):
+        headers = await seed_admin_with_tasks()
+        await warm_up(client, headers)
+
+        # Один SELECT сторінки користувачів (tasks_count денормалізовано)
+        with assert_query_budget(1):
+            response = await client.get("/api/admin/users", headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()["items"]) >= 6
+
+        # Версія даних для ETag і один SELECT сторінки завдань
+        for view in ("summary", "full"):
+            with assert_query_budget(2):
+                response = await client.get(f"/api/tasks/?view={view}", headers=headers)
+            assert response.status_code == 200
+            assert len(response.json()["items"]) == 5
+
+    run_app(body)
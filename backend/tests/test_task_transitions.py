@@ -0,0 +1,146 @@
+"""Паралельні переходи станів завдання: умовний UPDATE/DELETE пропускає лише один запит"""
+import asyncio
+import collections
+import itertools
+
+import pytest
+from sqlalchemy import select
+
+from src.models.database import User, FacebookAccount
+from src.services.auth import create_access_token
+from src.services.database import AsyncSessionLocal
+from src.services.stats_counters import reconcile_counters
+
+CONTENDERS = 8
+TASKS = 4
+
+_seed_ids = itertools.count()
+
+async def seed_users():
+    """Адмін, власник завдань та акаунт для гео; повертає заголовки авторизації"""
+    suffix = next(_seed_ids)
+    admin_id, owner_id = f"race-admin-{suffix}", f"race-user-{suffix}"
+    async with AsyncSessionLocal() as db:
+        db.add(User(telegram_id=admin_id, username=admin_id, is_approved=True, is_admin=True))
+        db.add(User(telegram_id=owner_id, username=owner_id, is_approved=True))
+        account = (await db.execute(
+            select(FacebookAccount).where(FacebookAccount.account_name == "race_account")
+        )).scalar_one_or_none()
+        if account is None:
+            # Створення завдання вимагає активного акаунта для гео
+            db.add(FacebookAccount(account_name="race_account", geo_location="US"))
+        await db.commit()
+        await reconcile_counters(db)
+
+    # Токени без claims: права читаються з БД, як для старих токенів
+    admin = {"Authorization": f"Bearer {create_access_token({'telegram_id': admin_id})}"}
+    owner = {"Authorization": f"Bearer {create_access_token({'telegram_id': owner_id})}"}
+    return admin, owner
+
+async def create_tasks(client, owner, count: int = TASKS):
+    task_ids = []
+    for i in range(count):
+        response = await client.post("/api/tasks/", headers=owner, json={
+            "geo_location": "US",
+            "comments": [f"race {i}"] * 8,
+            "post_links": [f"https://facebook.com/post/{i}"]
+        })
+        assert response.status_code == 200, response.text
+        task_ids.append(response.json()["task_id"])
+    return task_ids
+
+def decide(client, admin, task_id: str, i: int):
+    return client.post("/api/admin/approve-task", headers=admin, json={
+        "task_id": task_id,
+        "action": "approve" if i % 2 == 0 else "reject"
+    })
+
+def cancel(client, owner, task_id: str):
+    return client.delete(f"/api/tasks/{task_id}", headers=owner)
+
+async def assert_counters_match_recount():
+    async with AsyncSessionLocal() as db:
+        assert await reconcile_counters(db) == {}
+
+def test_concurrent_decisions_have_one_winner(run_app):
+    async def body(client):
+        admin, owner = await seed_users()
+        task_ids = await create_tasks(client, owner)
+
+        results = await asyncio.gather(*(
+            asyncio.gather(*(decide(client, admin, task_id, i) for i in range(CONTENDERS)))
+            for task_id in task_ids
+        ))
+
+        for responses in results:
+            codes = collections.Counter(response.status_code for response in responses)
+            assert codes == {200: 1, 409: CONTENDERS - 1}
+        await assert_counters_match_recount()
+
+    run_app(body)
+
+def test_concurrent_cancels_have_one_winner(run_app):
+    async def body(client):
+        admin, owner = await seed_users()
+        task_ids = await create_tasks(client, owner)
+
+        results = await asyncio.gather(*(
+            asyncio.gather(*(cancel(client, owner, task_id) for _ in range(CONTENDERS)))
+            for task_id in task_ids
+        ))
+
+        for responses in results:
+            codes = [response.status_code for response in responses]
+            # Програвші бачать уже видалене завдання: 404 (або 409 до коміту переможця)
+            assert codes.count(200) == 1
+            assert all(code in (404, 409) for code in codes if code != 200)
+        await assert_counters_match_recount()
+
+    run_app(body)
+
+def test_decisions_racing_cancels(run_app):
+    """Скасування схваленого завдання дозволене: 200 може бути два (approve, потім cancel)"""
+    async def body(client):
+        admin, owner = await seed_users()
+        task_ids = await create_tasks(client, owner)
+
+        results = await asyncio.gather(*(
+            asyncio.gather(
+                *(decide(client, admin, task_id, i) for i in range(CONTENDERS)),
+                *(cancel(client, owner, task_id) for _ in range(CONTENDERS))
+            )
+            for task_id in task_ids
+        ))
+
+        for responses in results:
+            codes = [response.status_code for response in responses]
+            decision_codes, cancel_codes = codes[:CONTENDERS], codes[CONTENDERS:]
+            assert all(code in (200, 404, 409) for code in codes)
+            assert decision_codes.count(200) <= 1
+            assert cancel_codes.count(200) <= 1
+            assert decision_codes.count(200) + cancel_codes.count(200) >= 1
+        await assert_counters_match_recount()
+
+    run_app(body)
+
+def test_concurrent_claims_take_task_once(run_app):
+    """Повторні доставки одного повідомлення: approved → processing лише один раз"""
+    automation = pytest.importorskip("src.tasks.automation")
+
+    async def body(client):
+        admin, owner = await seed_users()
+        task_ids = await create_tasks(client, owner)
+        for task_id in task_ids:
+            response = await decide(client, admin, task_id, 0)
+            assert response.status_code == 200
+
+        results = await asyncio.gather(*(
+            asyncio.gather(*(automation._claim_task(task_id) for _ in range(CONTENDERS)))
+            for task_id in task_ids
+        ))
+
+        for claimed in results:
+            assert claimed.count(True) == 1
+        await assert_counters_match_recount()
+
+    run_app(body)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
@@ -10,35 +10,96 @@ load_dotenv()
 
 # Імпорти локальних модулів
 from src.routes import auth, tasks, admin, accounts
-from src.services.database import engine, get_db_session
-from src.models.database import Base
+from src.services.database import engine, get_db_session, AsyncSessionLocal, close_database
+from src.models.database import Base, create_missing_columns, create_missing_indexes
+from src.services.activity import activity_tracker
+from src.services.sql_metrics import SQLTimingMiddleware
+from src.services.metrics import PrometheusMiddleware, render_metrics
+from src.services.stats_counters import read_counters, reconcile_counters
+from src.services.serialization import FastJSONResponse, json_bytes_response
+from src.services.task_events import task_event_broker
+from src.services.health import health_monitor
+from src.services.outbox import outbox_relay
+from src.services.data_versions import STATIC_CACHE_CONTROL
 
 # Ініціалізація безпеки
 security = HTTPBearer()
 
+# Схема вже підготовлена в цьому процесі (або в головному процесі serve.py до fork)
+_database_initialized = False
+
+async def init_database():
+    """Створення таблиць, нових колонок та індексів і початкових лічильників.
+
+    Виконується один раз: serve.py викликає її в головному процесі до
+    запуску воркерів, тож вони не виконують DDL одночасно.
+    """
+    global _database_initialized
+    if _database_initialized:
+        return
+    
+    # Створення таблиць бази даних
+    concurrent_indexes = engine.dialect.name == "postgresql"
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        added_columns = await conn.run_sync(create_missing_columns)
+        if not concurrent_indexes:
+            await conn.run_sync(create_missing_indexes)
+    if concurrent_indexes:
+        # CREATE INDEX CONCURRENTLY не може виконуватись у транзакції
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.run_sync(create_missing_indexes, True)
+    
+    if added_columns:
+        print(f"🧩 Додано колонки: {', '.join(added_columns)}")
+    
+    # Початкове заповнення лічильників статистики для існуючої БД
+    async with AsyncSessionLocal() as session:
+        if not await read_counters(session):
+            await reconcile_counters(session)
+    
+    _database_initialized = True
+    print("✅ База даних готова")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle events для додатку"""
     # Startup
     print("🚀 Запуск сервера...")
     
-    # Створення таблиць бази даних
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await init_database()
     
-    print("✅ База даних готова")
+    # Фоновий запис last_activity
+    activity_tracker.start()
+    # Підписка на зміни статусів завдань (Postgres LISTEN)
+    task_event_broker.start()
+    # Фонові перевірки БД та брокера для /health/ready
+    health_monitor.start()
+    # Публікація outbox у брокер Celery поза циклом подій
+    outbox_relay.start()
     
     yield
     
     # Shutdown
     print("🛑 Зупинка сервера...")
+    await outbox_relay.stop()
+    await health_monitor.stop()
+    await task_event_broker.stop()
+    # Фінальний запис накопичених last_activity, потім закриття пулів з'єднань
+    await activity_tracker.stop()
+    await close_database()
 
 # Створення додатку FastAPI
 app = FastAPI(
     title="Telegram Facebook Comment Bot API",
     description="API для автоматизації коментарів у Facebook через Telegram Mini App",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson замість json.dumps для всіх маршрутів (~10-25% на рендерингу);
+    # jsonable_encoder FastAPI все одно виконує, тому гарячі списки
+    # обходять його через json_bytes_response
+    default_response_class=FastJSONResponse
 )
 
 # CORS налаштування
@@ -53,6 +114,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing з кількістю SQL-запитів та часом БД
+app.add_middleware(SQLTimingMiddleware)
+
+# Prometheus: латентність за маршрутами та запити в роботі (зовнішній шар)
+app.add_middleware(PrometheusMiddleware)
+
 # Реєстрація маршрутів
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"])
@@ -70,15 +137,40 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check для моніторингу"""
-    return {
-        "status": "healthy",
-        "database": "connected"
-    }
+    """Health check для моніторингу (кешований стан готовності, як у /health/ready)"""
+    snapshot = health_monitor.snapshot()
+    database = snapshot["checks"].get("database", {})
+    ready = snapshot["status"] == "ready"
+    return json_bytes_response(
+        {
+            "status": "healthy" if ready else "unhealthy",
+            "database": "connected" if database.get("ok") else "unavailable"
+        },
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness: процес живий і обслуговує event loop (без перевірки залежностей)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: кешований результат фонових SELECT 1 (і PING брокера, якщо він обов'язковий), стан пулу"""
+    snapshot = health_monitor.snapshot()
+    status_code = status.HTTP_200_OK if snapshot["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return json_bytes_response(snapshot, status_code=status_code)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики у форматі Prometheus"""
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
 
 @app.get("/api/info")
-async def api_info():
+async def api_info(response: Response):
     """Інформація про API"""
+    response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
     return {
         "name": "Telegram Facebook Comment Bot",
         "version": "1.0.0",
@@ -92,6 +184,7 @@ async def api_info():
     }
 
 if __name__ == "__main__":
+    # Локальна розробка з перезавантаженням; продакшн-запуск — serve.py
     import uvicorn
     uvicorn.run(
         "main:app",
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, update, func
-from typing import List, Optional
+from sqlalchemy import select, and_, or_, update, func, literal_column, tuple_
+from typing import List, Literal, Optional
 from datetime import datetime
 
 from src.services.auth import get_current_admin_user
-from src.services.database import get_db_session
-from src.models.database import User, AutomationTask, FacebookAccount
-from src.services.queue import queue_automation_task
+from src.services.database import get_db_session, get_read_session
+from src.models.database import User, AutomationTask, FacebookAccount, search_key
+from src.services.outbox import enqueue_automation_task
+from src.routes.tasks import task_detail_columns
+from src.services.serialization import rows_to_dicts, json_bytes_response
+from src.services.exports import export_response
+from src.services.task_events import notify_task_status
+from src.services.data_versions import bump_data_version
+from src.services.pagination import encode_cursor, decode_cursor
+from src.services.token_epochs import bump_token_epoch
+from src.services.task_transitions import raise_transition_failed
+from src.services.stats_counters import (
+    read_counters, record_task_status_change, record_user_approval_change,
+    USERS_TOTAL, USERS_APPROVED, TASK_STATUS_PREFIX
+)
 
 router = APIRouter()
 
@@ -22,6 +34,16 @@ class PendingTaskResponse(BaseModel):
     post_links: List[str]
     created_at: str
 
+class PendingTaskSummaryResponse(BaseModel):
+    id: str
+    user_id: int
+    username: str | None
+    first_name: str | None
+    geo_location: str
+    comments_count: int
+    post_links_count: int
+    created_at: str
+
 class UserApprovalRequest(BaseModel):
     user_id: int
     is_approved: bool
@@ -43,35 +65,53 @@ class UserListResponse(BaseModel):
     last_activity: str
     tasks_count: int
 
-@router.get("/pending-tasks", response_model=List[PendingTaskResponse])
+class UserListPageResponse(BaseModel):
+    items: List[UserListResponse]
+    next_cursor: str | None
+
+# Фільтр status для експорту користувачів
+USER_EXPORT_STATUSES = {
+    "approved": User.is_approved == True,
+    "pending": User.is_approved == False,
+    "admin": User.is_admin == True,
+}
+
+def _prefix_match(db: AsyncSession, column, prefix: str):
+    """Регістронезалежний пошук за префіксом по ключу пошуку (username_lc, first_name_lc)"""
+    prefix = search_key(prefix)
+    if db.get_bind().dialect.name == "postgresql":
+        # Індекс text_pattern_ops обслуговує LIKE з фіксованим початком
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return column.like(f"{escaped}%", escape="\\")
+    # SQLite не застосовує індекс до LIKE з escape, тому використовуємо діапазон
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper_bound)
+
+@router.get("/pending-tasks", response_model=List[PendingTaskResponse | PendingTaskSummaryResponse])
 async def get_pending_tasks(
+    view: Literal["summary", "full"] = "summary",
     admin_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
-    """Отримання завдань, що очікують схвалення"""
+    """Отримання завдань, що очікують схвалення (view=full — з коментарями та посиланнями)"""
     
     result = await db.execute(
-        select(AutomationTask, User)
+        select(
+            AutomationTask.id,
+            AutomationTask.user_id,
+            User.username,
+            User.first_name,
+            AutomationTask.geo_location,
+            AutomationTask.created_at,
+            *task_detail_columns(view)
+        )
         .join(User, AutomationTask.user_id == User.id)
-        .where(AutomationTask.status == "pending_approval")
-        .order_by(AutomationTask.created_at.asc())
+        # Літерал замість параметра, щоб планувальник використав частковий індекс
+        .where(AutomationTask.status == literal_column("'pending_approval'"))
+        .order_by(AutomationTask.created_at.asc(), AutomationTask.id.asc())
     )
     
-    tasks_and_users = result.all()
-    
-    return [
-        PendingTaskResponse(
-            id=str(task.id),
-            user_id=user.id,
-            username=user.username,
-            first_name=user.first_name,
-            geo_location=task.geo_location,
-            comments=task.comments,
-            post_links=task.post_links,
-            created_at=task.created_at.isoformat()
-        )
-        for task, user in tasks_and_users
-    ]
+    return json_bytes_response(rows_to_dicts(result.keys(), result.all()))
 
 @router.post("/approve-task")
 async def approve_or_reject_task(
@@ -88,90 +128,108 @@ async def approve_or_reject_task(
             detail="Невірний формат ID завдання"
         )
     
-    # Пошук завдання
-    result = await db.execute(
-        select(AutomationTask).where(AutomationTask.id == approval_request.task_id)
-    )
-    task = result.scalar_one_or_none()
-    
-    if not task:
+    if approval_request.action == "approve":
+        new_status = "approved"
+        values = {
+            "status": new_status,
+            "approved_at": datetime.utcnow(),
+            "admin_notes": approval_request.admin_notes
+        }
+    elif approval_request.action == "reject":
+        new_status = "rejected"
+        values = {
+            "status": new_status,
+            "admin_notes": approval_request.admin_notes or "Відхилено адміністратором"
+        }
+    else:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Завдання не знайдено"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Невірна дія. Використовуйте 'approve' або 'reject'"
         )
     
-    if task.status != "pending_approval":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Завдання вже оброблено"
+    # Один умовний UPDATE: з паралельних запитів статус змінить лише перший
+    result = await db.execute(
+        update(AutomationTask)
+        .where(
+            AutomationTask.id == approval_request.task_id,
+            AutomationTask.status == "pending_approval"
         )
+        .values(**values)
+        .returning(AutomationTask.id, AutomationTask.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    task = result.one_or_none()
     
-    if approval_request.action == "approve":
-        # Схвалення завдання
-        task.status = "approved"
-        task.approved_at = datetime.utcnow()
-        task.admin_notes = approval_request.admin_notes
-        
-        await db.commit()
-        
-        # Додавання до черги виконання
-        try:
-            await queue_automation_task(str(task.id))
-            message = f"Завдання {task.id} схвалено та додано до черги виконання"
-        except Exception as e:
-            message = f"Завдання схвалено, але помилка додавання до черги: {e}"
-        
+    if task is None:
+        await raise_transition_failed(db, approval_request.task_id, "Завдання вже оброблено")
+    
+    await record_task_status_change(db, "pending_approval", new_status)
+    await notify_task_status(db, task.user_id, task.id, new_status)
+    await bump_data_version(db, task.user_id)
+    if new_status == "approved":
+        # Запис для черги в тій самій транзакції; публікує фоновий ретранслятор
+        await enqueue_automation_task(db, task.id)
+    await db.commit()
+    
+    if new_status == "approved":
+        message = f"Завдання {task.id} схвалено та додано до черги виконання"
         print(f"✅ Адмін {admin_user.username} схвалив завдання {task.id}")
-        
-    elif approval_request.action == "reject":
-        # Відхилення завдання
-        task.status = "rejected"
-        task.admin_notes = approval_request.admin_notes or "Відхилено адміністратором"
-        
-        await db.commit()
-        
+    else:
         message = f"Завдання {task.id} відхилено"
         print(f"❌ Адмін {admin_user.username} відхилив завдання {task.id}")
-        
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Невірна дія. Використовуйте 'approve' або 'reject'"
-        )
     
-    return {"message": message, "task_id": str(task.id), "status": task.status}
+    return {"message": message, "task_id": str(task.id), "status": new_status}
 
-@router.get("/users", response_model=List[UserListResponse])
+@router.get("/users", response_model=UserListPageResponse)
 async def get_all_users(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    search: Optional[str] = Query(None, min_length=1, max_length=64, description="Префікс username або first_name"),
     admin_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
-    """Отримання списку всіх користувачів"""
+    """Отримання списку користувачів (keyset-пагінація від нових до старих, пошук за префіксом)"""
     
-    # Отримання користувачів з кількістю завдань
-    result = await db.execute(
-        select(User, func.count(AutomationTask.id).label('tasks_count'))
-        .outerjoin(AutomationTask, User.id == AutomationTask.user_id)
-        .group_by(User.id)
-        .order_by(User.created_at.desc())
+    # Кількість завдань зберігається в users.tasks_count, JOIN з завданнями не потрібен
+    query = (
+        select(
+            User.id,
+            User.telegram_id,
+            User.username,
+            User.first_name,
+            User.is_approved,
+            User.is_admin,
+            User.created_at,
+            func.coalesce(User.last_activity, User.created_at).label('last_activity'),
+            User.tasks_count
+        )
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(limit + 1)
     )
     
-    users_with_counts = result.all()
-    
-    return [
-        UserListResponse(
-            id=user.id,
-            telegram_id=user.telegram_id,
-            username=user.username,
-            first_name=user.first_name,
-            is_approved=user.is_approved,
-            is_admin=user.is_admin,
-            created_at=user.created_at.isoformat(),
-            last_activity=user.last_activity.isoformat() if user.last_activity else user.created_at.isoformat(),
-            tasks_count=tasks_count
-        )
-        for user, tasks_count in users_with_counts
-    ]
+    if search:
+        query = query.where(or_(
+            _prefix_match(db, User.username_lc, search),
+            _prefix_match(db, User.first_name_lc, search)
+        ))
+    
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(User.created_at, User.id) < tuple_(cursor_created_at, cursor_id))
+    
+    result = await db.execute(query)
+    users = result.all()
+    
+    # Зайвий рядок означає, що існує наступна сторінка
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+    
+    return json_bytes_response({
+        "items": rows_to_dicts(result.keys(), users),
+        "next_cursor": next_cursor
+    })
 
 @router.post("/approve-user")
 async def approve_user(
@@ -181,26 +239,49 @@ async def approve_user(
 ):
     """Схвалення або блокування користувача"""
     
-    # Пошук користувача
+    # Встановлення прав адміністратора (тільки якщо користувач схвалений)
+    values = {
+        "is_approved": approval_request.is_approved,
+        "is_admin": approval_request.is_approved and approval_request.is_admin
+    }
+    returned_columns = (User.id, User.username, User.is_approved, User.is_admin)
+    
+    # Умовний UPDATE: з паралельних запитів схвалення змінить лише перший,
+    # тож лічильник схвалених змінюється рівно один раз
     result = await db.execute(
-        select(User).where(User.id == approval_request.user_id)
+        update(User)
+        .where(
+            User.id == approval_request.user_id,
+            func.coalesce(User.is_approved, False) != approval_request.is_approved
+        )
+        .values(**values)
+        .returning(*returned_columns)
+        .execution_options(synchronize_session=False)
     )
-    user = result.scalar_one_or_none()
+    user = result.one_or_none()
     
-    if not user:
+    if user is not None:
+        await record_user_approval_change(db, not approval_request.is_approved, approval_request.is_approved)
+    else:
+        # Статус схвалення вже такий: оновлюються лише права адміністратора
+        result = await db.execute(
+            update(User)
+            .where(User.id == approval_request.user_id)
+            .values(**values)
+            .returning(*returned_columns)
+            .execution_options(synchronize_session=False)
+        )
+        user = result.one_or_none()
+    
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Користувача не знайдено"
         )
     
-    # Оновлення статусу користувача
-    user.is_approved = approval_request.is_approved
-    
-    # Встановлення прав адміністратора (тільки якщо користувач схвалений)
-    if approval_request.is_approved and approval_request.is_admin:
-        user.is_admin = True
-    else:
-        user.is_admin = False
+    # Інвалідація раніше виданих токенів з застарілими правами
+    await bump_token_epoch(db, user.id)
+    await bump_data_version(db, user.id)
     
     await db.commit()
     
@@ -219,26 +300,19 @@ async def approve_user(
 @router.get("/stats")
 async def get_admin_stats(
     admin_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Отримання статистики для адміністративної панелі"""
     
-    # Загальна кількість користувачів
-    total_users_result = await db.execute(select(func.count(User.id)))
-    total_users = total_users_result.scalar()
-    
-    # Схвалені користувачі
-    approved_users_result = await db.execute(
-        select(func.count(User.id)).where(User.is_approved == True)
-    )
-    approved_users = approved_users_result.scalar()
-    
-    # Завдання за статусами
-    tasks_stats_result = await db.execute(
-        select(AutomationTask.status, func.count(AutomationTask.id))
-        .group_by(AutomationTask.status)
-    )
-    tasks_stats = dict(tasks_stats_result.all())
+    # Користувачі та завдання за статусами з інкрементних лічильників
+    counters = await read_counters(db)
+    total_users = counters.get(USERS_TOTAL, 0)
+    approved_users = counters.get(USERS_APPROVED, 0)
+    tasks_stats = {
+        key[len(TASK_STATUS_PREFIX):]: value
+        for key, value in counters.items()
+        if key.startswith(TASK_STATUS_PREFIX) and value
+    }
     
     # Доступні Facebook акаунти за гео
     accounts_stats_result = await db.execute(
@@ -248,7 +322,7 @@ async def get_admin_stats(
     )
     accounts_stats = dict(accounts_stats_result.all())
     
-    return {
+    return json_bytes_response({
         "users": {
             "total": total_users,
             "approved": approved_users,
@@ -257,4 +331,76 @@ async def get_admin_stats(
         "tasks": tasks_stats,
         "facebook_accounts": accounts_stats,
         "updated_at": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    })
+
+@router.get("/export/{kind}")
+async def export_data(
+    kind: Literal["tasks", "users"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    statuses: Optional[List[str]] = Query(None, alias="status"),
+    admin_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Потокове вивантаження завдань або користувачів (NDJSON чи CSV)
+    
+    created_from включно, created_to не включно; status можна вказати кілька разів
+    (для користувачів: approved, pending, admin). Рядки йдуть від старих до нових.
+    """
+    
+    if kind == "tasks":
+        model = AutomationTask
+        query = select(
+            AutomationTask.id,
+            AutomationTask.user_id,
+            AutomationTask.geo_location,
+            AutomationTask.status,
+            AutomationTask.comments_posted,
+            AutomationTask.created_at,
+            AutomationTask.approved_at,
+            AutomationTask.started_at,
+            AutomationTask.completed_at,
+            AutomationTask.admin_notes,
+            AutomationTask.error_message,
+            *task_detail_columns("summary")
+        )
+        if statuses:
+            query = query.where(AutomationTask.status.in_(statuses))
+    else:
+        model = User
+        query = select(
+            User.id,
+            User.telegram_id,
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.is_approved,
+            User.is_admin,
+            User.created_at,
+            func.coalesce(User.last_activity, User.created_at).label('last_activity'),
+            User.tasks_count
+        )
+        if statuses:
+            unknown = [value for value in statuses if value not in USER_EXPORT_STATUSES]
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Невідомий статус користувача: {', '.join(unknown)}"
+                )
+            query = query.where(or_(*(USER_EXPORT_STATUSES[value] for value in statuses)))
+    
+    if created_from:
+        query = query.where(model.created_at >= created_from)
+    if created_to:
+        query = query.where(model.created_at < created_to)
+    
+    query = query.order_by(model.created_at.asc(), model.id.asc())
+    
+    print(f"📤 Адмін {admin_user.username} експортує {kind} ({format})")
+    
+    # Вивантаження може тривати хвилинами: з'єднання, на якому перевірявся
+    # токен (та сама закешована FastAPI сесія), повертається до пулу зараз,
+    # а export_response відкриває власну сесію для потоку
+    await db.close()
+    return export_response(query, format, kind)
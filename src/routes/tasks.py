@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List
+from sqlalchemy import select, and_, tuple_, func, update, delete
+from typing import List, Literal, Optional
 from datetime import datetime
+import asyncio
+import orjson
 
-from src.services.auth import get_current_approved_user, get_current_user
-from src.services.database import get_db_session
-from src.models.database import User, AutomationTask, FacebookAccount
-from src.services.queue import queue_automation_task
+from src.services.auth import (
+    get_current_approved_user, get_current_user, get_stream_user_id,
+    create_stream_token, STREAM_TOKEN_EXPIRE_SECONDS
+)
+from src.services.database import get_db_session, get_read_session
+from src.models.database import User, AutomationTask, FacebookAccount, TaskExecutionLog
+from src.services.outbox import discard_pending_messages
+from src.services.pagination import encode_cursor, decode_cursor
+from src.services.stats_counters import record_task_status_change
+from src.services.serialization import rows_to_dicts, json_bytes_response
+from src.services.task_events import task_event_broker, notify_task_status
+from src.services.task_transitions import raise_transition_failed
+from src.services.data_versions import (
+    user_data_etag, primary_user_data_etag, bump_data_version,
+    PRIVATE_CACHE_CONTROL, STATIC_CACHE_CONTROL
+)
 
 router = APIRouter()
 
@@ -30,10 +45,68 @@ class TaskResponse(BaseModel):
     admin_notes: str | None
     error_message: str | None
 
+class TaskSummaryResponse(BaseModel):
+    id: str
+    geo_location: str
+    comments_count: int
+    post_links_count: int
+    status: str
+    comments_posted: int
+    created_at: str
+    started_at: str | None
+    completed_at: str | None
+    admin_notes: str | None
+    error_message: str | None
+
+class TaskListResponse(BaseModel):
+    items: List[TaskResponse | TaskSummaryResponse]
+    next_cursor: str | None
+
+class TaskLogEntryResponse(BaseModel):
+    id: int
+    step: str
+    status: str
+    message: str
+    details: dict | None
+    timestamp: str
+
+class TaskLogPageResponse(BaseModel):
+    items: List[TaskLogEntryResponse]
+    next_cursor: str | None
+    has_more: bool
+
 class TaskStatusUpdate(BaseModel):
     status: str
     admin_notes: str | None = None
 
+# Скалярні колонки для списків; JSON-колонки завантажуються лише за view=full
+TASK_LIST_COLUMNS = (
+    AutomationTask.id,
+    AutomationTask.geo_location,
+    AutomationTask.status,
+    AutomationTask.comments_posted,
+    AutomationTask.created_at,
+    AutomationTask.started_at,
+    AutomationTask.completed_at,
+    AutomationTask.admin_notes,
+    AutomationTask.error_message,
+)
+
+def task_detail_columns(view: str) -> tuple:
+    """Колонки з вмістом завдання: повні JSON-масиви або лише їх довжини"""
+    if view == "full":
+        return (AutomationTask.comments, AutomationTask.post_links)
+    return (
+        func.json_array_length(AutomationTask.comments).label("comments_count"),
+        func.json_array_length(AutomationTask.post_links).label("post_links_count"),
+    )
+
+# Інтервал keep-alive коментарів у потоці SSE
+SSE_HEARTBEAT_SECONDS = 15
+
+# Статуси, з яких користувач може скасувати завдання
+CANCELLABLE_STATUSES = ("pending_approval", "approved")
+
 # Підтримувані гео локації
 SUPPORTED_GEOS = ["BR", "US", "UK", "DE", "FR", "ES", "IT", "CA", "AU", "MX"]
 
@@ -87,6 +160,15 @@ async def create_task(
     )
     
     db.add(new_task)
+    await db.flush()
+    await record_task_status_change(db, None, "pending_approval")
+    await notify_task_status(db, current_user.id, new_task.id, "pending_approval")
+    await bump_data_version(db, current_user.id)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(tasks_count=User.tasks_count + 1)
+    )
     await db.commit()
     await db.refresh(new_task)
     
@@ -98,44 +180,108 @@ async def create_task(
         "message": "Завдання подано на розгляд адміністратора"
     }
 
-@router.get("/", response_model=List[TaskResponse])
+@router.get("/", response_model=TaskListResponse)
 async def get_user_tasks(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session)
+    etag: str = Depends(user_data_etag),
+    db: AsyncSession = Depends(get_read_session)
 ):
-    """Отримання завдань поточного користувача"""
+    """Отримання завдань поточного користувача (keyset-пагінація від нових до старих)
     
-    result = await db.execute(
-        select(AutomationTask)
+    За замовчуванням (view=summary) повертаються лише скалярні поля та кількість
+    коментарів/посилань; повний вміст доступний через view=full або GET /{task_id}.
+    """
+    
+    query = (
+        select(*TASK_LIST_COLUMNS, *task_detail_columns(view))
         .where(AutomationTask.user_id == current_user.id)
-        .order_by(AutomationTask.created_at.desc())
+        .order_by(AutomationTask.created_at.desc(), AutomationTask.id.desc())
+        .limit(limit + 1)
     )
-    tasks = result.scalars().all()
-    
-    return [
-        TaskResponse(
-            id=str(task.id),
-            geo_location=task.geo_location,
-            comments=task.comments,
-            post_links=task.post_links,
-            status=task.status,
-            comments_posted=task.comments_posted,
-            created_at=task.created_at.isoformat(),
-            started_at=task.started_at.isoformat() if task.started_at else None,
-            completed_at=task.completed_at.isoformat() if task.completed_at else None,
-            admin_notes=task.admin_notes,
-            error_message=task.error_message
+    
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor, id_type=str)
+        query = query.where(
+            tuple_(AutomationTask.created_at, AutomationTask.id) < tuple_(cursor_created_at, cursor_id)
         )
-        for task in tasks
-    ]
+    
+    result = await db.execute(query)
+    tasks = result.all()
+    
+    # Зайвий рядок означає, що існує наступна сторінка
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].created_at, tasks[-1].id)
+    
+    # Рядки серіалізуються напряму, без ORM-об'єктів та проміжних Pydantic-моделей
+    return json_bytes_response(
+        {
+            "items": rows_to_dicts(result.keys(), tasks),
+            "next_cursor": next_cursor
+        },
+        headers={"ETag": etag, "Cache-Control": PRIVATE_CACHE_CONTROL}
+    )
+
+@router.post("/stream-token")
+async def issue_stream_token(
+    current_user: User = Depends(get_current_user)
+):
+    """Токен для EventSource: GET /api/tasks/stream?token=...
+    
+    Браузерний EventSource не надсилає Authorization, тож токен передається
+    в URL. Він діє STREAM_TOKEN_EXPIRE_SECONDS і перевіряється лише при
+    підключенні; якщо перепідключення отримало 401, клієнт бере новий токен.
+    """
+    return {"token": create_stream_token(current_user), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/stream")
+async def stream_task_events(
+    user_id: int = Depends(get_stream_user_id),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Потік SSE зі змінами статусів завдань поточного користувача"""
+    
+    # Потік може жити годинами: з'єднання з БД не повинно утримуватись.
+    # Це та сама (закешована FastAPI) сесія, в якій перевірявся Bearer-токен
+    await db.close()
+    
+    async def event_stream():
+        async with task_event_broker.subscribe(user_id) as queue:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    event_data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event_data is None:
+                    # Процес зупиняється: клієнт перепідключиться через retry
+                    break
+                event_data.pop("user_id", None)
+                yield b"event: task_status\ndata: " + orjson.dumps(event_data) + b"\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: str,
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(primary_user_data_etag),
     db: AsyncSession = Depends(get_db_session)
 ):
-    """Отримання конкретного завдання"""
+    """Отримання конкретного завдання
+    
+    Читається з основної бази, а не з репліки: клієнт запитує завдання
+    одразу після POST /, і відставання репліки дало б 404.
+    """
     
     # Використовуємо task_id як рядок, оскільки тепер UUID зберігається як String(36)
     if not task_id:
@@ -145,14 +291,14 @@ async def get_task(
         )
     
     result = await db.execute(
-        select(AutomationTask).where(
+        select(*TASK_LIST_COLUMNS, *task_detail_columns("full")).where(
             and_(
                 AutomationTask.id == task_id,
                 AutomationTask.user_id == current_user.id
             )
         )
     )
-    task = result.scalar_one_or_none()
+    task = result.one_or_none()
     
     if not task:
         raise HTTPException(
@@ -160,18 +306,87 @@ async def get_task(
             detail="Завдання не знайдено"
         )
     
-    return TaskResponse(
-        id=str(task.id),
-        geo_location=task.geo_location,
-        comments=task.comments,
-        post_links=task.post_links,
-        status=task.status,
-        comments_posted=task.comments_posted,
-        created_at=task.created_at.isoformat(),
-        started_at=task.started_at.isoformat() if task.started_at else None,
-        completed_at=task.completed_at.isoformat() if task.completed_at else None,
-        admin_notes=task.admin_notes,
-        error_message=task.error_message
+    # Рядок серіалізується напряму, без ORM-об'єкта та jsonable_encoder
+    return json_bytes_response(
+        dict(task._mapping),
+        headers={"ETag": etag, "Cache-Control": PRIVATE_CACHE_CONTROL}
+    )
+
+@router.get("/{task_id}/logs", response_model=TaskLogPageResponse)
+async def get_task_logs(
+    task_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    step: Optional[str] = None,
+    log_status: Optional[str] = Query(None, alias="status"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """Лог виконання завдання (keyset-пагінація за (timestamp, id))
+    
+    order=asc — хронологічно; next_cursor повертається і для порожньої
+    сторінки, тож клієнт може опитувати нові записи з тієї ж позиції.
+    order=desc — від нових до старих, next_cursor = null на останній сторінці.
+    Адміністратор бачить лог будь-якого завдання.
+    """
+    
+    owner_id = (await db.execute(
+        select(AutomationTask.user_id).where(AutomationTask.id == task_id)
+    )).scalar_one_or_none()
+    
+    if owner_id is None or (owner_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Завдання не знайдено"
+        )
+    
+    # Індекс ix_task_execution_logs_task_timestamp дає і фільтр, і порядок
+    position = tuple_(TaskExecutionLog.timestamp, TaskExecutionLog.id)
+    query = (
+        select(
+            TaskExecutionLog.id,
+            TaskExecutionLog.step,
+            TaskExecutionLog.status,
+            TaskExecutionLog.message,
+            TaskExecutionLog.details,
+            TaskExecutionLog.timestamp
+        )
+        .where(TaskExecutionLog.task_id == task_id)
+        .limit(limit + 1)
+    )
+    if order == "asc":
+        query = query.order_by(TaskExecutionLog.timestamp.asc(), TaskExecutionLog.id.asc())
+    else:
+        query = query.order_by(TaskExecutionLog.timestamp.desc(), TaskExecutionLog.id.desc())
+    
+    if step:
+        query = query.where(TaskExecutionLog.step == step)
+    if log_status:
+        query = query.where(TaskExecutionLog.status == log_status)
+    
+    if cursor:
+        cursor_timestamp, cursor_id = decode_cursor(cursor)
+        boundary = tuple_(cursor_timestamp, cursor_id)
+        query = query.where(position > boundary if order == "asc" else position < boundary)
+    
+    result = await db.execute(query)
+    entries = result.all()
+    
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if entries and (has_more or order == "asc"):
+        next_cursor = encode_cursor(entries[-1].timestamp, entries[-1].id)
+    else:
+        next_cursor = cursor if order == "asc" else None
+    
+    return json_bytes_response(
+        {
+            "items": rows_to_dicts(result.keys(), entries),
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        },
+        headers={"Cache-Control": PRIVATE_CACHE_CONTROL}
     )
 
 @router.delete("/{task_id}")
@@ -189,36 +404,45 @@ async def cancel_task(
             detail="Невірний формат ID завдання"
         )
     
+    # Один умовний DELETE: завдання, яке вже взяв воркер, не видаляється
     result = await db.execute(
-        select(AutomationTask).where(
-            and_(
-                AutomationTask.id == task_id,
-                AutomationTask.user_id == current_user.id
-            )
+        delete(AutomationTask)
+        .where(
+            AutomationTask.id == task_id,
+            AutomationTask.user_id == current_user.id,
+            AutomationTask.status.in_(CANCELLABLE_STATUSES)
         )
+        .returning(AutomationTask.status)
+        .execution_options(synchronize_session=False)
     )
-    task = result.scalar_one_or_none()
+    cancelled_status = result.scalar_one_or_none()
     
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Завдання не знайдено"
+    if cancelled_status is None:
+        await raise_transition_failed(
+            db, task_id,
+            "Неможливо скасувати завдання, що вже виконується або завершено",
+            user_id=current_user.id
         )
     
-    if task.status not in ["pending_approval", "approved"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Неможливо скасувати завдання, що вже виконується або завершено"
-        )
-    
-    await db.delete(task)
+    if cancelled_status == "approved":
+        # Схвалене завдання ще може чекати на публікацію в outbox
+        await discard_pending_messages(db, task_id)
+    await record_task_status_change(db, cancelled_status, None)
+    await notify_task_status(db, current_user.id, task_id, "cancelled")
+    await bump_data_version(db, current_user.id)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(tasks_count=User.tasks_count - 1)
+    )
     await db.commit()
     
     return {"message": "Завдання скасовано"}
 
 @router.get("/supported/geos")
-async def get_supported_geos():
+async def get_supported_geos(response: Response):
     """Отримання списку підтримуваних гео локацій"""
+    response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
     return {
         "supported_geos": SUPPORTED_GEOS,
         "descriptions": {
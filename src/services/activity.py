@@ -0,0 +1,130 @@
+from sqlalchemy import bindparam, or_, text, update
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from src.models.database import User
+from src.services.database import engine, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Інтервал скидання накопичених відміток активності в БД
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "15"))
+# Точність last_activity: частіші оновлення одного користувача не записуються
+ACTIVITY_GRANULARITY_SECONDS = float(os.getenv("ACTIVITY_GRANULARITY_SECONDS", "60"))
+# Максимальна кількість рядків в одному UPDATE
+ACTIVITY_BATCH_SIZE = 500
+
+class ActivityTracker:
+    """Накопичення User.last_activity в пам'яті та пакетний запис у фоні.
+
+    Замість коміту на кожен автентифікований запит відмітки збираються
+    у словник і раз на інтервал записуються одним UPDATE ... FROM (VALUES ...).
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        granularity: float = ACTIVITY_GRANULARITY_SECONDS
+    ):
+        self.flush_interval = flush_interval
+        self.granularity = timedelta(seconds=granularity)
+        self._pending: Dict[int, datetime] = {}
+        self._stored: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id: int, stored: Optional[datetime] = None) -> None:
+        """Реєстрація активності користувача (без звернення до БД)"""
+        now = datetime.utcnow()
+        last = self._stored.get(user_id) or stored
+        if last is not None and now - last < self.granularity:
+            return
+        self._pending[user_id] = now
+        self._stored[user_id] = now
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Запис накопичених відміток у БД, повертає кількість користувачів"""
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        rows = list(pending.items())
+
+        try:
+            async with AsyncSessionLocal() as session:
+                for start in range(0, len(rows), ACTIVITY_BATCH_SIZE):
+                    await self._write_batch(session, rows[start:start + ACTIVITY_BATCH_SIZE])
+                await session.commit()
+        except Exception as e:
+            # Повертаємо відмітки назад (новіші, що прийшли під час запису, мають пріоритет)
+            for user_id, ts in pending.items():
+                self._pending.setdefault(user_id, ts)
+            logger.error(f"Помилка запису last_activity: {e}")
+            return 0
+
+        # Старі записи більше не захищають від повторного запису, їх можна забути
+        threshold = datetime.utcnow() - self.granularity
+        self._stored = {
+            user_id: ts for user_id, ts in self._stored.items() if ts >= threshold
+        }
+        return len(rows)
+
+    async def _write_batch(self, session, rows: List[Tuple[int, datetime]]) -> None:
+        if engine.dialect.name == "postgresql":
+            # Один UPDATE ... FROM (VALUES ...) на пакет
+            placeholders = []
+            params = {}
+            for i, (user_id, ts) in enumerate(rows):
+                placeholders.append(f"(CAST(:id_{i} AS INTEGER), CAST(:ts_{i} AS TIMESTAMP))")
+                params[f"id_{i}"] = user_id
+                params[f"ts_{i}"] = ts
+            await session.execute(
+                text(
+                    "UPDATE users SET last_activity = v.ts "
+                    f"FROM (VALUES {', '.join(placeholders)}) AS v(id, ts) "
+                    "WHERE users.id = v.id "
+                    "AND (users.last_activity IS NULL OR users.last_activity < v.ts)"
+                ),
+                params
+            )
+        else:
+            # SQLite не підтримує список колонок у псевдонімі VALUES:
+            # executemany за первинним ключем у тій самій транзакції
+            # (з тією ж умовою, щоб last_activity не йшов назад)
+            await session.execute(
+                update(User.__table__)
+                .where(User.id == bindparam("user_id"))
+                .where(or_(User.last_activity.is_(None), User.last_activity < bindparam("ts")))
+                .values(last_activity=bindparam("ts")),
+                [{"user_id": user_id, "ts": ts} for user_id, ts in rows]
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Запуск фонового скидання (викликається з lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Зупинка фонового скидання з фінальним записом"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Глобальний екземпляр трекера
+activity_tracker = ActivityTracker()
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
@@ -8,18 +8,35 @@ import os
 import hashlib
 import hmac
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from urllib.parse import unquote
 
-from src.models.database import User
-from src.services.database import get_db_session
+from src.models.database import User, InitDataExchange
+from src.services.database import get_db_session, dialect_insert
+from src.services.token_epochs import token_epoch_cache
+from src.services.activity import activity_tracker
+from src.services.init_data_cache import init_data_cache, VerifiedInitData, INIT_DATA_MAX_EXCHANGES
+from src.services.metrics import AUTH_TOKEN_RESOLUTIONS
 
 security = HTTPBearer()
+# Потік SSE: EventSource не надсилає заголовків, тож токен може прийти в query
+optional_security = HTTPBearer(auto_error=False)
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 днів
+# Токен потоку подій потрапляє в URL (журнали проксі): короткий строк і лише для /stream
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+STREAM_TOKEN_SCOPE = "task_events"
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Секретний ключ Mini App залежить лише від токена бота: обчислюється один раз при імпорті
+TELEGRAM_SECRET_KEY = hmac.new(
+    b"WebAppData",
+    TELEGRAM_BOT_TOKEN.encode(),
+    hashlib.sha256
+).digest() if TELEGRAM_BOT_TOKEN else None
+# Довіряти правам з JWT-claims замість читання користувача з БД на кожен запит
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "true").lower() == "true"
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Створення JWT токена"""
@@ -33,8 +50,88 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_telegram_auth(init_data: str) -> Dict[str, Any]:
-    """Перевірка автентифікації Telegram Mini App"""
+def create_stream_token(user: User) -> str:
+    """Короткостроковий токен для підключення EventSource до потоку подій.
+
+    Без telegram_id у claims: get_current_user його не приймає, тож
+    токен з URL не відкриває решту API.
+    """
+    return jwt.encode(
+        {
+            "uid": user.id,
+            "scope": STREAM_TOKEN_SCOPE,
+            "exp": datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+        },
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+
+def build_user_claims(user: User, epoch: int) -> Dict[str, Any]:
+    """Claims користувача, достатні для авторизації без звернення до БД"""
+    return {
+        "telegram_id": user.telegram_id,
+        "uid": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "is_approved": bool(user.is_approved),
+        "is_admin": bool(user.is_admin),
+        "ep": epoch
+    }
+
+def _user_from_claims(payload: Dict[str, Any]) -> User:
+    """Відновлення користувача з claims (об'єкт не прив'язаний до сесії)"""
+    return User(
+        id=payload["uid"],
+        telegram_id=payload["telegram_id"],
+        username=payload.get("username"),
+        first_name=payload.get("first_name"),
+        is_approved=payload["is_approved"],
+        is_admin=payload["is_admin"]
+    )
+
+async def _claim_init_data_exchange(db: AsyncSession, key: str, expires_at: float) -> bool:
+    """Облік обміну initData на токен у поточній транзакції (коміт виконує викликач).
+
+    Лічильник у БД спільний для всіх воркерів; рядок блокується до коміту,
+    тож паралельні входи не перевищать INIT_DATA_MAX_EXCHANGES.
+    False — ліміт уже вичерпано.
+    """
+    stmt = dialect_insert(db, InitDataExchange).values(
+        key=key, exchanges=1, expires_at=datetime.utcfromtimestamp(expires_at)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InitDataExchange.key],
+        set_={"exchanges": InitDataExchange.exchanges + 1},
+        where=InitDataExchange.exchanges < INIT_DATA_MAX_EXCHANGES
+    ).returning(InitDataExchange.exchanges)
+    return (await db.execute(stmt)).scalar_one_or_none() is not None
+
+async def verify_telegram_auth(init_data: str, db: AsyncSession) -> VerifiedInitData:
+    """Перевірка автентифікації Telegram Mini App з лімітом обмінів на токен.
+
+    Повертає запис кешу: claims заповнені, якщо за цим initData вже видавався токен.
+    """
+    # Повтор уже перевіреного payload відповідається з кешу без HMAC
+    cache_key = init_data_cache.key(init_data)
+    verified = init_data_cache.lookup(cache_key)
+    cached = verified is not None
+    if not cached:
+        init_data_cache.misses += 1
+        user_data, expires_at = _verify_init_data(init_data)
+        verified = init_data_cache.store(cache_key, user_data, expires_at=expires_at)
+    
+    if not await _claim_init_data_exchange(db, cache_key, verified.expires_at):
+        init_data_cache.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Дані автентифікації вже використані, відкрийте додаток повторно"
+        )
+    if cached:
+        init_data_cache.hits += 1
+    return verified
+
+def _verify_init_data(init_data: str) -> Tuple[Dict[str, Any], float]:
+    """HMAC-перевірка initData: (дані користувача, кінець 24-годинного вікна)"""
     try:
         # Парсинг init_data
         parsed_data = {}
@@ -51,16 +148,12 @@ def verify_telegram_auth(init_data: str) -> Dict[str, Any]:
             data_check_arr.append(f"{key}={value}")
         data_check_string = '\n'.join(data_check_arr)
         
-        # Створення секретного ключа
-        secret_key = hmac.new(
-            b"WebAppData", 
-            TELEGRAM_BOT_TOKEN.encode(), 
-            hashlib.sha256
-        ).digest()
+        if TELEGRAM_SECRET_KEY is None:
+            raise ValueError("TELEGRAM_BOT_TOKEN не налаштовано")
         
         # Обчислення hash
         calculated_hash = hmac.new(
-            secret_key,
+            TELEGRAM_SECRET_KEY,
             data_check_string.encode(),
             hashlib.sha256
         ).hexdigest()
@@ -85,7 +178,7 @@ def verify_telegram_auth(init_data: str) -> Dict[str, Any]:
         # Парсинг даних користувача
         user_data = json.loads(parsed_data.get('user', '{}'))
         
-        return user_data
+        return user_data, auth_date + 86400
         
     except Exception as e:
         raise HTTPException(
@@ -113,7 +206,16 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Швидкий шлях: права з токена актуальні, якщо епоха користувача не змінилась
+    if AUTH_STATELESS and "ep" in payload and "uid" in payload:
+        current_epoch = await token_epoch_cache.get(payload["uid"])
+        if payload["ep"] >= current_epoch:
+            activity_tracker.touch(payload["uid"])
+            AUTH_TOKEN_RESOLUTIONS.labels("claims").inc()
+            return _user_from_claims(payload)
+    
     # Пошук користувача в базі даних
+    AUTH_TOKEN_RESOLUTIONS.labels("database").inc()
     result = await db.execute(
         select(User).where(User.telegram_id == telegram_id)
     )
@@ -122,12 +224,38 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
     
-    # Оновлення останньої активності
-    user.last_activity = datetime.utcnow()
-    await db.commit()
+    # Оновлення останньої активності (пакетний запис у фоні)
+    activity_tracker.touch(user.id, stored=user.last_activity)
     
     return user
 
+async def get_stream_user_id(
+    token: Optional[str] = Query(None, description="Токен з POST /api/tasks/stream-token"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db_session)
+) -> int:
+    """ID користувача потоку подій: токен потоку з query або звичайний Bearer"""
+    if token is None:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Неможливо підтвердити облікові дані",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return (await get_current_user(credentials, db)).id
+    
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    if payload.get("scope") != STREAM_TOKEN_SCOPE or "uid" not in payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Токен потоку недійсний або застарів, отримайте новий"
+        )
+    activity_tracker.touch(payload["uid"])
+    return payload["uid"]
+
 async def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
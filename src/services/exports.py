@@ -0,0 +1,68 @@
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+import orjson
+
+from src.services.database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Рядків на одну вибірку серверного курсора (і на один шматок відповіді)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    # Starlette сам додає charset=utf-8 для text/*
+    "csv": "text/csv",
+}
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode_ndjson(keys: Sequence[str], rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+async def stream_rows(query: Select, export_format: str) -> AsyncIterator[bytes]:
+    """Рядки запиту частинами по EXPORT_BATCH_SIZE через серверний курсор.
+
+    Сесія відкривається всередині генератора і живе, поки клієнт читає
+    відповідь; у пам'яті одночасно лише одна частина рядків.
+    """
+    async with ReadSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        keys = tuple(result.keys())
+        if export_format == "csv":
+            yield _encode_csv([keys])
+        try:
+            async for partition in result.partitions():
+                if export_format == "csv":
+                    yield _encode_csv(partition)
+                else:
+                    yield _encode_ndjson(keys, partition)
+        except Exception as e:
+            # Заголовки вже надіслано: обрізаний файл — єдиний спосіб повідомити про помилку
+            logger.error(f"Помилка експорту: {e}")
+            raise
+
+def export_response(query: Select, export_format: str, name: str) -> StreamingResponse:
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        stream_rows(query, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
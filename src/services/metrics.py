@@ -0,0 +1,166 @@
+from prometheus_client import (
+    Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import os
+import time
+from typing import Dict, Optional
+
+from src.services.init_data_cache import init_data_cache
+
+# Межі гістограм (секунди): від швидких відповідей з кешу до повільних адмін-звітів
+LATENCY_BUCKETS = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Тривалість обробки HTTP-запиту",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запити, що обробляються зараз",
+    # Кілька воркерів (serve.py): сума по живих процесах
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_seconds",
+    "Час отримання з'єднання з пулу (очікування вільного або встановлення нового)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+AUTH_TOKEN_RESOLUTIONS = Counter(
+    "auth_token_resolutions_total",
+    "Перевірки JWT за джерелом користувача: claims (без БД) або database",
+    ["source"]
+)
+OUTBOX_PUBLISHED = Counter(
+    "outbox_publish_total",
+    "Спроби публікації повідомлень outbox у брокер за результатом",
+    ["result"]
+)
+
+# Шляхи, які не враховуються в гістограмі (сам scrape та проби здоров'я)
+EXCLUDED_PATHS = {"/metrics", "/health", "/health/live", "/health/ready"}
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул з'єднань, що вимірює час видачі з'єднання"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+
+def pool_status(pool) -> Optional[Dict[str, int]]:
+    """Знімок пулу з'єднань або None для пулів без обліку (NullPool у SQLite)"""
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+class _PoolCollector:
+    """Стан пулів з'єднань на момент scrape (без накладних витрат між scrape)"""
+
+    DOCUMENTATION = {
+        "size": "Розмір пулу з'єднань",
+        "checked_out": "З'єднання, видані сесіям",
+        "checked_in": "Вільні з'єднання в пулі",
+        "overflow": "З'єднання понад pool_size (від'ємне — ще не створені)",
+    }
+
+    def __init__(self):
+        # Роль двигуна (primary/replica) -> синхронний двигун
+        self.engines: Dict[str, object] = {}
+
+    def collect(self):
+        statuses = {role: pool_status(engine.pool) for role, engine in self.engines.items()}
+        for key, documentation in self.DOCUMENTATION.items():
+            gauge = GaugeMetricFamily(f"db_pool_{key}", documentation, labels=["role"])
+            for role, status in statuses.items():
+                if status is not None:
+                    gauge.add_metric([role], status[key])
+            yield gauge
+
+class _InitDataCacheCollector:
+    def collect(self):
+        hits = CounterMetricFamily(
+            "auth_init_data_cache_hits", "Повтори initData, обслужені з кешу перевірок"
+        )
+        hits.add_metric([], init_data_cache.hits)
+        yield hits
+        misses = CounterMetricFamily(
+            "auth_init_data_cache_misses", "initData, що потребували HMAC-перевірки"
+        )
+        misses.add_metric([], init_data_cache.misses)
+        yield misses
+        rejected = CounterMetricFamily(
+            "auth_init_data_exchanges_rejected", "initData, відхилені після вичерпання ліміту обмінів"
+        )
+        rejected.add_metric([], init_data_cache.rejected)
+        yield rejected
+        size = GaugeMetricFamily("auth_init_data_cache_entries", "Записів у кеші перевірок initData")
+        size.add_metric([], len(init_data_cache))
+        yield size
+
+_pool_collector = _PoolCollector()
+_init_data_cache_collector = _InitDataCacheCollector()
+REGISTRY.register(_pool_collector)
+REGISTRY.register(_init_data_cache_collector)
+
+def register_pool_metrics(engine, role: str = "primary") -> None:
+    """Підключення метрик пулу для (синхронного) двигуна SQLAlchemy"""
+    _pool_collector.engines[role] = engine
+
+def render_metrics() -> tuple:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # Кілька воркерів: лічильники та гістограми всіх процесів з файлів
+    # PROMETHEUS_MULTIPROC_DIR; пул і кеш initData — лише процесу, що відповідає
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_pool_collector)
+    registry.register(_init_data_cache_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class PrometheusMiddleware:
+    """ASGI middleware: латентність за шаблоном маршруту та кількість запитів у роботі.
+
+    Шаблон ("/api/tasks/{task_id}") береться з scope["route"], який
+    встановлює роутер, тож кардинальність не залежить від ID у шляху.
+    Запити, що не потрапили в жоден маршрут, мають route="unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            ).observe(time.perf_counter() - started)
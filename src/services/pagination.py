@@ -0,0 +1,25 @@
+from fastapi import HTTPException, status
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple, Union
+
+def encode_cursor(timestamp: datetime, row_id: Union[int, str]) -> str:
+    """Курсор keyset-пагінації: позиція (timestamp, id) останнього рядка сторінки"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, id_type: type = int) -> Tuple[datetime, Any]:
+    """Розбір курсора, отриманого від клієнта (id має бути типу ключа id_type)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # Точний тип: інакше bool пройде як int, а словник дійде до WHERE
+        if type(row_id) is not id_type:
+            raise ValueError("invalid cursor id")
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Невірний курсор пагінації"
+        )
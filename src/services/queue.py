@@ -1,4 +1,5 @@
 from celery import Celery
+import asyncio
 import os
 from typing import Optional
 
@@ -10,7 +11,7 @@ celery_app = Celery(
     "automation_tasks",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["src.tasks.automation"]
+    include=["src.tasks.automation", "src.tasks.maintenance"]
 )
 
 # Конфігурація Celery
@@ -39,25 +40,38 @@ celery_app.conf.task_routes = {
 celery_app.conf.task_default_queue = "default"
 celery_app.conf.task_create_missing_queues = True
 
+# Ім'я та черга завдання обробки коментарів
+AUTOMATION_TASK_NAME = "src.tasks.automation.process_facebook_comments"
+AUTOMATION_QUEUE = "facebook_automation"
+
+def publish_task(task_name: str, args: list, queue: str, priority: int = 5, connection=None) -> str:
+    """Синхронна публікація в брокер (блокує потік до відповіді брокера).
+
+    Без власних повторів Celery: повторні спроби з затримкою виконує
+    ретранслятор outbox, тож недоступний брокер не тримає потік хвилинами.
+    Результат не відстежується бекендом: стан завдання зберігається в БД,
+    а підписка на результат сама чекала б на Redis до 20 секунд.
+    """
+    result = celery_app.send_task(
+        task_name,
+        args=args,
+        queue=queue,
+        priority=priority,
+        retry=False,
+        ignore_result=True,
+        connection=connection
+    )
+    return result.id
+
 async def queue_automation_task(task_id: str, priority: int = 5) -> str:
-    """Додавання завдання автоматизації до черги"""
+    """Додавання завдання автоматизації до черги (публікація в окремому потоці)"""
     try:
-        result = celery_app.send_task(
-            "src.tasks.automation.process_facebook_comments",
-            args=[task_id],
-            queue="facebook_automation",
-            priority=priority,
-            retry=True,
-            retry_policy={
-                'max_retries': 3,
-                'interval_start': 0,
-                'interval_step': 60,
-                'interval_max': 600,
-            }
+        celery_task_id = await asyncio.to_thread(
+            publish_task, AUTOMATION_TASK_NAME, [task_id], AUTOMATION_QUEUE, priority
         )
         
-        print(f"✅ Завдання {task_id} додано до черги: {result.id}")
-        return result.id
+        print(f"✅ Завдання {task_id} додано до черги: {celery_task_id}")
+        return celery_task_id
         
     except Exception as e:
         print(f"❌ Помилка додавання завдання до черги: {e}")
@@ -98,6 +112,11 @@ celery_app.conf.beat_schedule = {
         'task': 'src.tasks.maintenance.cleanup_old_tasks',
         'schedule': 6 * 60 * 60,  # 6 годин
     },
+    # Звірка лічильників статистики адмін-панелі щогодини
+    'reconcile-stats-counters': {
+        'task': 'src.tasks.maintenance.reconcile_stats_counters',
+        'schedule': 60 * 60,  # 1 година
+    },
     # Перевірка стану Facebook акаунтів щодня
     'check-facebook-accounts': {
         'task': 'src.tasks.maintenance.check_facebook_accounts_health',
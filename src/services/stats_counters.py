@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, delete
+from datetime import datetime
+from typing import Dict, Optional
+
+from src.models.database import User, AutomationTask, StatsCounter
+from src.services.database import dialect_insert
+
+USERS_TOTAL = "users.total"
+USERS_APPROVED = "users.approved"
+TASK_STATUS_PREFIX = "tasks.status."
+
+def task_status_key(status: str) -> str:
+    return f"{TASK_STATUS_PREFIX}{status}"
+
+async def increment_counter(db: AsyncSession, key: str, delta: int = 1) -> None:
+    """Атомарна зміна лічильника в поточній транзакції (коміт виконує викликач)"""
+    if delta == 0:
+        return
+    stmt = dialect_insert(db, StatsCounter).values(
+        key=key, value=delta, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StatsCounter.key],
+        set_={
+            "value": StatsCounter.value + stmt.excluded.value,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    await db.execute(stmt)
+
+async def record_user_created(db: AsyncSession, is_approved: bool = False) -> None:
+    # Порядок ключів, як у reconcile_counters: users.approved < users.total
+    if is_approved:
+        await increment_counter(db, USERS_APPROVED)
+    await increment_counter(db, USERS_TOTAL)
+
+async def record_user_approval_change(db: AsyncSession, was_approved: bool, is_approved: bool) -> None:
+    if bool(was_approved) != bool(is_approved):
+        await increment_counter(db, USERS_APPROVED, 1 if is_approved else -1)
+
+async def record_task_status_change(
+    db: AsyncSession,
+    old_status: Optional[str],
+    new_status: Optional[str]
+) -> None:
+    """Перенесення завдання між лічильниками статусів (None — створення/видалення).
+
+    Рядки змінюються в порядку ключів, як їх блокує reconcile_counters:
+    інакше перехід і перерахунок можуть взаємно заблокуватись.
+    """
+    if old_status == new_status:
+        return
+    deltas = {}
+    if old_status is not None:
+        deltas[task_status_key(old_status)] = -1
+    if new_status is not None:
+        deltas[task_status_key(new_status)] = 1
+    for key, delta in sorted(deltas.items()):
+        await increment_counter(db, key, delta)
+
+async def read_counters(db: AsyncSession) -> Dict[str, int]:
+    result = await db.execute(select(StatsCounter.key, StatsCounter.value))
+    return dict(result.all())
+
+async def reconcile_counters(db: AsyncSession) -> Dict[str, int]:
+    """Перерахунок лічильників з вихідних таблиць (виправлення розбіжностей).
+
+    Рядки лічильників блокуються до підрахунку: транзакції, що змінюють
+    вихідні таблиці, чекають на них і додадуть свій інкремент уже після
+    коміту перерахунку. Записується лише різниця (value = value + delta),
+    тож інкременти нових ключів, що не були заблоковані, не перезаписуються.
+
+    Повертає словник виправлень {ключ: різниця} для логування.
+    """
+    # SQLite: вся транзакція на єдиному з'єднанні-писачі, паралельних записів немає
+    db.sync_session.info["use_writer"] = True
+    stored = dict((await db.execute(
+        select(StatsCounter.key, StatsCounter.value)
+        .order_by(StatsCounter.key)
+        .with_for_update()
+    )).all())
+
+    total_users = (await db.execute(select(func.count(User.id)))).scalar()
+    approved_users = (await db.execute(
+        select(func.count(User.id)).where(User.is_approved == True)
+    )).scalar()
+    tasks_by_status = dict((await db.execute(
+        select(AutomationTask.status, func.count(AutomationTask.id))
+        .group_by(AutomationTask.status)
+    )).all())
+
+    actual = {USERS_TOTAL: total_users, USERS_APPROVED: approved_users}
+    for task_status, count in tasks_by_status.items():
+        actual[task_status_key(task_status)] = count
+
+    drift = {}
+    for key in set(actual) | set(stored):
+        difference = actual.get(key, 0) - stored.get(key, 0)
+        if difference:
+            drift[key] = difference
+
+    for key, difference in sorted(drift.items()):
+        await increment_counter(db, key, difference)
+    # Статуси, яких більше немає, видаляються, щоб не засмічувати таблицю
+    stale_keys = [key for key in stored if key not in actual]
+    if stale_keys:
+        await db.execute(delete(StatsCounter).where(
+            StatsCounter.key.in_(stale_keys),
+            StatsCounter.value == 0
+        ))
+    await db.commit()
+
+    return drift
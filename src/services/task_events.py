@@ -0,0 +1,146 @@
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional, Set
+
+from src.services.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Канал Postgres LISTEN/NOTIFY для змін статусів завдань
+TASK_EVENTS_CHANNEL = "task_status"
+# Максимум непрочитаних подій на одного підписника (повільні клієнти втрачають старі)
+SUBSCRIBER_QUEUE_SIZE = 100
+# Пауза перед повторним підключенням LISTEN після обриву з'єднання
+LISTEN_RECONNECT_SECONDS = 5
+
+class TaskEventBroker:
+    """Розсилка змін статусів завдань підписникам SSE.
+
+    Postgres: події публікуються через pg_notify у транзакції зміни статусу
+    (доставляються після коміту всім процесам API, включно з воркерами Celery
+    як джерелом), а кожен процес API слухає канал одним з'єднанням.
+    SQLite: події розсилаються в межах процесу після коміту сесії.
+    Підписник без подій нічого не коштує: він просто чекає на asyncio.Queue.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._listen_task: Optional[asyncio.Task] = None
+        self.closing = False
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Черга подій користувача; None у черзі означає завершення потоку"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if self.closing:
+            queue.put_nowait(None)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    @property
+    def subscribers_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish_local(self, event_data: dict) -> None:
+        """Доставка події підписникам цього процесу"""
+        for queue in self._subscribers.get(event_data["user_id"], ()):
+            try:
+                queue.put_nowait(event_data)
+            except asyncio.QueueFull:
+                logger.warning(f"Черга подій SSE переповнена для користувача {event_data['user_id']}")
+
+    def close_subscribers(self) -> None:
+        """Завершення всіх потоків SSE (початок зупинки процесу).
+
+        Потоки нескінченні, тож без цього вони тримали б процес до
+        таймауту плавної зупинки; клієнти перепідключаються до інших воркерів.
+        """
+        self.closing = True
+        for queues in self._subscribers.values():
+            for queue in queues:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self.publish_local(json.loads(payload))
+        except Exception as e:
+            logger.error(f"Невірна подія {channel}: {e}")
+
+    async def _listen_forever(self) -> None:
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver_connection = raw.driver_connection
+                    terminated = asyncio.Event()
+                    driver_connection.add_termination_listener(lambda _: terminated.set())
+                    await driver_connection.add_listener(TASK_EVENTS_CHANNEL, self._on_notify)
+                    try:
+                        await terminated.wait()
+                    finally:
+                        if not driver_connection.is_closed():
+                            await driver_connection.remove_listener(TASK_EVENTS_CHANNEL, self._on_notify)
+                logger.warning("З'єднання LISTEN втрачено, повторне підключення")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка LISTEN {TASK_EVENTS_CHANNEL}: {e}")
+            await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+
+    def start(self) -> None:
+        """Запуск LISTEN для Postgres (викликається з lifespan)"""
+        if engine.dialect.name == "postgresql" and self._listen_task is None:
+            self._listen_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+
+async def notify_task_status(db: AsyncSession, user_id: int, task_id: str, status: str) -> None:
+    """Публікація зміни статусу завдання після коміту поточної транзакції"""
+    event_data = {
+        "user_id": user_id,
+        "task_id": str(task_id),
+        "status": status,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    if db.get_bind().dialect.name == "postgresql":
+        # NOTIFY транзакційний: подія піде лише якщо транзакція закомітиться
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": TASK_EVENTS_CHANNEL, "payload": json.dumps(event_data)}
+        )
+    else:
+        db.sync_session.info.setdefault("task_events", []).append(event_data)
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_local_events(session) -> None:
+    for event_data in session.info.pop("task_events", ()):
+        task_event_broker.publish_local(event_data)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_local_events(session) -> None:
+    session.info.pop("task_events", None)
+
+# Глобальний екземпляр брокера
+task_event_broker = TaskEventBroker()
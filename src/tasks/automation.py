@@ -16,6 +16,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
 from src.models.database import AutomationTask, FacebookAccount, TaskExecutionLog
 from src.services.encryption import credential_manager
 from src.services.queue import celery_app
+from src.services.stats_counters import record_task_status_change
+from src.services.task_events import notify_task_status
+from src.services.data_versions import bump_data_version
 from automation.src.browser_manager import BrowserManager
 from automation.src.facebook_automation import FacebookCommentBot
 
@@ -84,14 +87,16 @@ async def _process_comments_async(celery_task, task_id: str) -> Dict:
             task = result.scalar_one_or_none()
             break
         
+        # Повторне повідомлення outbox або завдання, скасоване після публікації:
+        # пропускаємо, не змінюючи статус (завдання може виконувати інший воркер)
         if not task:
-            raise Exception(f"Завдання {task_id} не знайдено в БД")
+            logger.warning(f"⏭️ Завдання {task_id} не знайдено в БД, повідомлення пропущено")
+            return {"status": "skipped", "reason": "not_found"}
         
-        if task.status != "approved":
-            raise Exception(f"Завдання {task_id} не схвалено для виконання")
-        
-        # Оновлення статусу на "processing"
-        await _update_task_status(task_id, "processing")
+        # Атомарний перехід approved → processing: лише одна доставка бере завдання
+        if not await _claim_task(task_id):
+            logger.warning(f"⏭️ Завдання {task_id} вже не в статусі approved, повідомлення пропущено")
+            return {"status": "skipped", "reason": "not_approved"}
         
         # Отримання Facebook аккаунта
         async for db in get_db_session():
@@ -260,6 +265,25 @@ async def _process_comments_async(celery_task, task_id: str) -> Dict:
         if browser_manager:
             await browser_manager.close()
 
+async def _claim_task(task_id: str) -> bool:
+    """Переведення завдання approved → processing; False, якщо його вже взято"""
+    async for db in get_db_session():
+        result = await db.execute(
+            update(AutomationTask)
+            .where(AutomationTask.id == task_id, AutomationTask.status == "approved")
+            .values(status="processing", started_at=datetime.utcnow())
+            .returning(AutomationTask.user_id)
+        )
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            await db.rollback()
+            return False
+        await record_task_status_change(db, "approved", "processing")
+        await notify_task_status(db, user_id, task_id, "processing")
+        await bump_data_version(db, user_id)
+        await db.commit()
+        return True
+
 async def _update_task_status(
     task_id: str, 
     status: str, 
@@ -286,11 +310,26 @@ async def _update_task_status(
             if facebook_account_id:
                 update_data["facebook_account_id"] = facebook_account_id
             
-            await db.execute(
+            # Попередній статус потрібен для лічильників статистики
+            old_status_result = await db.execute(
+                select(AutomationTask.status)
+                .where(AutomationTask.id == task_id)
+                .with_for_update()
+            )
+            old_status = old_status_result.scalar_one_or_none()
+            
+            result = await db.execute(
                 update(AutomationTask)
                 .where(AutomationTask.id == task_id)
                 .values(**update_data)
+                .returning(AutomationTask.user_id)
             )
+            user_id = result.scalar_one_or_none()
+            if old_status is not None:
+                await record_task_status_change(db, old_status, status)
+            if user_id is not None:
+                await notify_task_status(db, user_id, task_id, status)
+                await bump_data_version(db, user_id)
             await db.commit()
             break
             